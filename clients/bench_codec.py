@@ -0,0 +1,104 @@
+"""Benchmark JSON codecs on the payloads the maker, taker and data clients exchange.
+
+Usage: python bench_codec.py [--number N]
+
+For every available codec this measures the encode cost (called the way socket.io calls it,
+with compact separators) and the decode cost per RFQ, quote and order payload.
+"""
+
+import argparse
+import timeit
+from src_codec import get_json_codec
+
+RFQ_PAYLOAD = {
+    "rfqId": 1842,
+    "quoteAssetReceiverAddress": "0xa0f75491720835b36edC92D06DDc468D201e9b73",
+    "baseAssetChainId": 1,
+    "quoteAssetChainId": 1,
+    "baseAssetAddress": "0xCd5fE23C85820F7B72D0926FC9b05b43E359b7ee",
+    "quoteAssetAddress": "0x7f39C581F595B53c5cb19bD0b3f8dA6c935E2Ca0",
+    "baseAmount": None,
+    "quoteAmount": "100000000000000000000",
+    "ttlMsecs": 5000,
+    "executor": "TAKER",
+    "useCase": "ION_DELEVERAGE",
+}
+
+QUOTE_PAYLOAD = {
+    "jsonrpc": "2.0",
+    "method": "hg_submitQuote",
+    "params": {"rfqId": 1842, "baseAmount": "112000000000000000000"},
+    "id": "018e0b5c-7d3a-7c1e-9a3f-2b8c4d5e6f70",
+}
+
+ORDER_PAYLOAD = {
+    "components": {
+        "offerer": "0x7B695C6d35f96Ded5f3d74e0DB433034b02d42fb",
+        "zone": "0x0000000000000000000000000000000000000000",
+        "offer": [
+            {
+                "itemType": 1,
+                "token": "0x7f39C581F595B53c5cb19bD0b3f8dA6c935E2Ca0",
+                "identifierOrCriteria": "0",
+                "startAmount": "100000000000000000000",
+                "endAmount": "100000000000000000000",
+            }
+        ],
+        "consideration": [
+            {
+                "itemType": 1,
+                "token": "0xCd5fE23C85820F7B72D0926FC9b05b43E359b7ee",
+                "identifierOrCriteria": "0",
+                "startAmount": "112000000000000000000",
+                "endAmount": "112000000000000000000",
+                "recipient": "0xa0f75491720835b36edC92D06DDc468D201e9b73",
+            },
+            {
+                "itemType": 1,
+                "token": "0xCd5fE23C85820F7B72D0926FC9b05b43E359b7ee",
+                "identifierOrCriteria": "0",
+                "startAmount": "10000000000000000",
+                "endAmount": "10000000000000000",
+                "recipient": "0x7B695C6d35f96Ded5f3d74e0DB433034b02d42fb",
+            },
+        ],
+        "orderType": 0,
+        "startTime": 1708000000,
+        "endTime": 1708000300,
+        "zoneHash": "0x0000000000000000000000000000000000000000000000000000000000000000",
+        "salt": "24446860302761739304752683030156737591518664810215442929801184233530467942051",
+        "conduitKey": "0xa8c94ae38b04140794a9394b76ac6d0a83ac0b02000000000000000000000000",
+        "counter": "0",
+    },
+    "signature": "0x" + "ab" * 64,
+}
+
+PAYLOADS = {"rfq": RFQ_PAYLOAD, "quote": QUOTE_PAYLOAD, "order": ORDER_PAYLOAD}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=100_000)
+    args = parser.parse_args()
+
+    print(f"{'codec':<10}{'payload':<10}{'bytes':>8}{'encode us':>12}{'decode us':>12}")
+    for name in ("json", "orjson", "msgspec"):
+        try:
+            codec = get_json_codec(name)
+        except ImportError as e:
+            print(f"{name:<10}skipped ({e})")
+            continue
+        for payload_name, payload in PAYLOADS.items():
+            encoded = codec.dumps(payload, separators=(",", ":"))
+            encode_s = timeit.timeit(
+                lambda: codec.dumps(payload, separators=(",", ":")), number=args.number
+            )
+            decode_s = timeit.timeit(lambda: codec.loads(encoded), number=args.number)
+            print(
+                f"{name:<10}{payload_name:<10}{len(encoded):>8}"
+                f"{encode_s / args.number * 1e6:>12.2f}{decode_s / args.number * 1e6:>12.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
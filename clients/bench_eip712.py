@@ -0,0 +1,132 @@
+"""Check and benchmark the precomputed Seaport signing path against sign_order.
+
+Usage: python bench_eip712.py [--orders 500] [--iterations 200]
+
+First signs `--orders` random orders (1-4 offer and consideration items, decimal and hex
+amounts, random salts, addresses and counters) with both src_shared.sign_order and
+src_eip712.sign_order_fast and fails unless the payloads are identical, and compares
+order_digest with eth_account's EIP-712 hash for random counters and chains. Then reports
+per-order time of the digest alone and of the full signature for both paths. With the
+optional coincurve package installed eth_keys signs in C and the remaining ECDSA cost drops.
+"""
+
+import argparse
+import random
+import secrets
+import sys
+import time
+from eth_account.messages import encode_typed_data
+from eth_keys.backends import get_backend
+from eth_utils import to_checksum_address
+from web3 import Web3
+from src_eip712 import order_digest, sign_order_fast
+from src_shared import get_message_to_sign, sign_order
+from src_taker import OrderParameters
+
+PKEY = "0x00c070c13b6db03050939ad697b76167c05e32916b48b3c607abdccb2a1bd433"
+
+
+def random_address() -> str:
+    return to_checksum_address("0x" + secrets.token_hex(20))
+
+
+def random_amount() -> str:
+    value = random.getrandbits(random.choice((8, 64, 128, 256)))
+    return hex(value) if random.random() < 0.2 else str(value)
+
+
+def random_item(recipient: bool):
+    item = {
+        "itemType": random.choice((0, 1, 2, 3)),
+        "token": random_address(),
+        "identifierOrCriteria": random_amount(),
+        "startAmount": random_amount(),
+        "endAmount": random_amount(),
+    }
+    if recipient:
+        item["recipient"] = random_address()
+    return item
+
+
+def random_order():
+    now = int(time.time())
+    return {
+        "offerer": random_address(),
+        "zone": random_address(),
+        "offer": [random_item(False) for _ in range(random.randint(1, 4))],
+        "consideration": [random_item(True) for _ in range(random.randint(1, 4))],
+        "orderType": random.choice((0, 1, 2, 3)),
+        "startTime": now,
+        "endTime": now + random.randint(1, 10**6),
+        "zoneHash": "0x" + secrets.token_hex(32),
+        "salt": random_amount(),
+        "conduitKey": "0x" + secrets.token_hex(32),
+        "counter": "0",
+    }
+
+
+def reference_digest(components, counter: int, chain_id: int) -> bytes:
+    parameters = OrderParameters(
+        **components, totalOriginalConsiderationItems=len(components["consideration"])
+    )
+    message = get_message_to_sign(parameters, counter)
+    message["domain"]["chainId"] = chain_id
+    signable = encode_typed_data(full_message=message)
+    return Web3.keccak(b"\x19" + signable.version + signable.header + signable.body)
+
+
+def check(orders):
+    w3 = Web3()
+    for components in orders:
+        counter, chain_id = random.getrandbits(64), random.choice((1, 5, 17000))
+        expected = sign_order(
+            w3=w3, pkey=PKEY, components_raw=components, counter=counter
+        )
+        signed = sign_order_fast(pkey=PKEY, components_raw=components, counter=counter)
+        if signed != expected:
+            sys.exit(f"Signed payloads differ for {components}")
+        if order_digest(components, counter, chain_id=chain_id) != reference_digest(
+            components, counter, chain_id
+        ):
+            sys.exit(f"Digests differ for {components}")
+    print(f"{len(orders)} random orders: identical signatures and digests")
+
+
+def per_order_us(fn, orders, iterations: int) -> float:
+    started = time.perf_counter()
+    for i in range(iterations):
+        fn(orders[i % len(orders)])
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    orders = [random_order() for _ in range(args.orders)]
+    check(orders)
+
+    w3 = Web3()
+    print(f"eth_keys backend: {type(get_backend()).__name__}")
+    print(f"{'':<10}{'sign_order us':>16}{'fast path us':>14}{'speedup':>10}")
+    for name, slow, fast in (
+        (
+            "digest",
+            lambda c: reference_digest(c, 0, 1),
+            lambda c: order_digest(c, 0),
+        ),
+        (
+            "signature",
+            lambda c: sign_order(w3=w3, pkey=PKEY, components_raw=c),
+            lambda c: sign_order_fast(pkey=PKEY, components_raw=c),
+        ),
+    ):
+        slow_us = per_order_us(slow, orders, args.iterations)
+        fast_us = per_order_us(fast, orders, args.iterations)
+        print(f"{name:<10}{slow_us:>16.0f}{fast_us:>14.0f}{slow_us / fast_us:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
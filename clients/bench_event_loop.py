@@ -0,0 +1,136 @@
+"""Benchmark the maker client on the asyncio and uvloop event loops.
+
+Usage: python bench_event_loop.py [--port 3198] [--rfq-rate 2000] [--duration 10]
+
+Starts src_mock_server.py in a subprocess broadcasting `--rfq-rate` synthetic RFQs per
+second, subscribes a maker to them and answers every RFQ with submit_quote. For each loop it
+reports RFQs received and quotes acknowledged per second, client CPU time per RFQ (broadcast
+handling plus the quote round trip), and submit_quote round-trip percentiles. Loops that are
+not installed are skipped.
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from bench_multiplex import wait_for_port
+from src_config import get_maker_api_user
+from src_maker import MakerNamespaceBase, join_market, leave_market, submit_quote
+from src_metrics import LatencyRecorder
+from src_runtime import ClientRuntime, new_event_loop, uvloop
+
+
+class QuotingMaker(MakerNamespaceBase):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rfqs = 0
+        self.quotes = 0
+        self.errors = 0
+        self.tasks = set()
+
+    def on_RequestForQuoteBroadcast(self, data):
+        self.rfqs += 1
+        task = asyncio.create_task(self.quote(data["rfqId"]))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return "ACK"
+
+    async def quote(self, rfq_id):
+        try:
+            await submit_quote(self, self.client, rfq_id=rfq_id, base_amount="1")
+            self.quotes += 1
+        except Exception:
+            self.errors += 1
+
+    def handle_successful_hg_submitQuote(self, result):
+        pass
+
+    def handle_successful_hg_unsubscribeFromMarket(self, result):
+        pass
+
+
+async def run(url: str, duration: float):
+    user = get_maker_api_user("Wintermute")
+    runtime = ClientRuntime(url)
+    maker = runtime.add(
+        QuotingMaker("/maker", set_access_token=lambda token: None),
+        {"clientId": user["clientId"], "clientSecret": user["clientSecret"]},
+    )
+    maker.latency = LatencyRecorder()
+    await runtime.connect()
+    await join_market(maker, runtime.sio, 1)
+
+    started, cpu_started = time.perf_counter(), time.process_time()
+    await asyncio.sleep(duration)
+    await leave_and_drain(maker, runtime)
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+    await runtime.disconnect()
+
+    histogram = maker.latency.get("/maker", "hg_submitQuote")
+    return {
+        "rfqs_per_s": maker.rfqs / elapsed,
+        "quotes_per_s": maker.quotes / elapsed,
+        "errors": maker.errors,
+        "cpu_us_per_rfq": cpu / maker.rfqs * 1e6 if maker.rfqs else 0.0,
+        "p50": histogram.percentile(50) if histogram else 0.0,
+        "p99": histogram.percentile(99) if histogram else 0.0,
+    }
+
+
+async def leave_and_drain(maker: QuotingMaker, runtime: ClientRuntime):
+    """Stop the broadcasts and wait for the quotes still in flight"""
+    await leave_market(maker, runtime.sio, 1)
+    if maker.tasks:
+        await asyncio.wait(maker.tasks, timeout=5)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=3198)
+    parser.add_argument("--rfq-rate", type=float, default=2000.0)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "src_mock_server.py",
+            "--port",
+            str(args.port),
+            "--rfq-rate",
+            str(args.rfq_rate),
+            "--fill-delay",
+            "-1",
+        ],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_port(args.port)
+        url = f"http://127.0.0.1:{args.port}"
+        print(
+            f"{'loop':<10}{'rfqs/s':>10}{'quotes/s':>10}{'errors':>8}"
+            f"{'cpu us/rfq':>12}{'p50 ms':>10}{'p99 ms':>10}"
+        )
+        for kind in ("asyncio", "uvloop"):
+            if kind == "uvloop" and uvloop is None:
+                print(f"{kind:<10}not installed, run `pip install uvloop`")
+                continue
+            with asyncio.Runner(loop_factory=lambda: new_event_loop(kind)) as runner:
+                r = runner.run(run(url, args.duration))
+            print(
+                f"{kind:<10}{r['rfqs_per_s']:>10.0f}{r['quotes_per_s']:>10.0f}"
+                f"{r['errors']:>8}{r['cpu_us_per_rfq']:>12.1f}"
+                f"{r['p50']:>10.3f}{r['p99']:>10.3f}"
+            )
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
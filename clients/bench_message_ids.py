@@ -0,0 +1,47 @@
+"""Benchmark JSON-RPC message id generators.
+
+Usage: python bench_message_ids.py [--number N] [--in-flight N]
+
+Compares uuid7 string ids against per-connection counter ids for the cost of generating an
+id, and of inserting and looking up `--in-flight` ids in a dict (what sent_messages does for
+every request and reply). Lookups use ids decoded from JSON, as replies from the server are,
+so string ids pay for hashing and comparing fresh objects.
+"""
+
+import argparse
+import json
+import timeit
+from src_rpc import get_id_generator
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=200_000)
+    parser.add_argument("--in-flight", type=int, default=10_000)
+    args = parser.parse_args()
+
+    print(f"{'ids':<10}{'generate ns':>14}{'insert ns':>12}{'lookup ns':>12}")
+    for kind in ("uuid7", "counter"):
+        next_id = get_id_generator(kind)
+        generate_s = timeit.timeit(next_id, number=args.number)
+
+        ids = [next_id() for _ in range(args.in_flight)]
+        insert_s = min(
+            timeit.repeat(lambda: {msg_id: None for msg_id in ids}, number=10, repeat=5)
+        )
+        table = {msg_id: None for msg_id in ids}
+        reply_ids = json.loads(json.dumps(ids))
+        lookup_s = min(
+            timeit.repeat(
+                lambda: [table[msg_id] for msg_id in reply_ids], number=10, repeat=5
+            )
+        )
+        per_op = 10 * args.in_flight
+        print(
+            f"{kind:<10}{generate_s / args.number * 1e9:>14.1f}"
+            f"{insert_s / per_op * 1e9:>12.1f}{lookup_s / per_op * 1e9:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
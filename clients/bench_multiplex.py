@@ -0,0 +1,167 @@
+"""Benchmark one multiplexed connection against one connection per role.
+
+Usage: python bench_multiplex.py [--port 3198] [--rounds 20] [--requests 500]
+
+Starts src_mock_server.py in a subprocess and connects the /maker, /taker and /data
+namespaces either through three socketio.AsyncClients (what the notebooks do) or through a
+single ClientRuntime. Reports the time to connect all three roles, the file descriptors held
+by the clients, and the time for `--requests` concurrent JSON-RPC calls per role.
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from src_config import (
+    get_maker_api_user,
+    get_taker_api_protocol_user,
+    weETH,
+    wstETH,
+)
+from src_data import DataNamespace, get_markets
+from src_maker import MakerNamespaceBase, leave_market
+from src_runtime import ClientRuntime
+from src_taker import TakerNamespaceBase
+from src_taker_actions import create_rfq
+
+
+def open_fds() -> int:
+    return len(os.listdir("/proc/self/fd"))
+
+
+def wait_for_port(port: int, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"Mock server did not start on port {port}")
+
+
+def make_roles():
+    maker_user = get_maker_api_user("Wintermute")
+    taker_user = get_taker_api_protocol_user("ion-protocol")
+    return [
+        (
+            MakerNamespaceBase("/maker", set_access_token=lambda token: None),
+            {
+                "clientId": maker_user["clientId"],
+                "clientSecret": maker_user["clientSecret"],
+            },
+        ),
+        (
+            TakerNamespaceBase("/taker", set_access_token=lambda token: None),
+            {"source": taker_user["source"], "secret": taker_user["secret"]},
+        ),
+        (DataNamespace("/data"), None),
+    ]
+
+
+async def connect_separate(url: str):
+    clients = []
+    for ns, auth in make_roles():
+        runtime = ClientRuntime(url)
+        runtime.add(ns, auth)
+        clients.append(runtime)
+    await asyncio.gather(*(runtime.connect() for runtime in clients))
+    return clients
+
+
+async def connect_multiplexed(url: str):
+    runtime = ClientRuntime(url)
+    for ns, auth in make_roles():
+        runtime.add(ns, auth)
+    await runtime.connect()
+    return [runtime]
+
+
+def request_quote(ns, sio):
+    return create_rfq(
+        ns,
+        sio,
+        base_asset_address=weETH,
+        quote_asset_address=wstETH,
+        quote_amount="1000000000",
+        chain_id=1,
+        executor="TAKER",
+        use_case="ION_DELEVERAGE",
+    )
+
+
+async def exercise(clients, requests: int):
+    """Issue `requests` concurrent calls on every namespace.
+
+    The maker leaves rather than joins a market so that RFQs are not broadcast back to it.
+    """
+    calls = []
+    for runtime in clients:
+        for ns in runtime.sio.namespace_handlers.values():
+            if isinstance(ns, MakerNamespaceBase):
+                calls += [leave_market(ns, runtime.sio, 1) for _ in range(requests)]
+            elif isinstance(ns, DataNamespace):
+                calls += [get_markets(ns, runtime.sio) for _ in range(requests)]
+            elif isinstance(ns, TakerNamespaceBase):
+                calls += [request_quote(ns, runtime.sio) for _ in range(requests)]
+    await asyncio.gather(*calls, return_exceptions=True)
+
+
+async def run(setup, url: str, rounds: int, requests: int):
+    connect_s = exercise_s = 0.0
+    fds = 0
+    for _ in range(rounds):
+        before = open_fds()
+        started = time.perf_counter()
+        clients = await setup(url)
+        connect_s += time.perf_counter() - started
+        fds = open_fds() - before
+
+        started = time.perf_counter()
+        await exercise(clients, requests)
+        exercise_s += time.perf_counter() - started
+        for runtime in clients:
+            await runtime.disconnect()
+    return connect_s / rounds, fds, exercise_s / rounds
+
+
+async def bench(args):
+    url = f"http://127.0.0.1:{args.port}"
+    print(f"{'setup':<14}{'connect ms':>12}{'fds':>6}{'calls/s':>12}")
+    for name, setup in (
+        ("separate", connect_separate),
+        ("multiplexed", connect_multiplexed),
+    ):
+        connect_s, fds, exercise_s = await run(setup, url, args.rounds, args.requests)
+        print(
+            f"{name:<14}{connect_s * 1000:>12.2f}{fds:>6}"
+            f"{3 * args.requests / exercise_s:>12.0f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=3198)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    server = subprocess.Popen(
+        [sys.executable, "src_mock_server.py", "--port", str(args.port)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_port(args.port)
+        asyncio.run(bench(args))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
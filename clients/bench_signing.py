@@ -0,0 +1,113 @@
+"""Benchmark QuoteAccepted signing inline on the event loop and in SigningService pools.
+
+Usage: python bench_signing.py [--bursts 10] [--burst-size 50] [--workers 1 2 4]
+
+Fires bursts of concurrent QuoteAccepted events at IonDeleverageMakerNamespace and reports
+signatures per second, per-event latency percentiles, and the worst event-loop stall seen by
+a 1 ms ticker running alongside (how long every other event would have waited). Process pools
+only beat threads with more than one core free for signing.
+"""
+
+import argparse
+import asyncio
+import copy
+import os
+import time
+from eth_account import Account
+from src_metrics import LatencyHistogram
+from src_mock_server import MockHourglassServer
+from src_signing import SigningService
+from src_strategies import IonDeleverageMakerNamespace
+
+PKEY = "0x00c070c13b6db03050939ad697b76167c05e32916b48b3c607abdccb2a1bd433"
+RFQ = {
+    "baseAssetAddress": "0xCd5fE23C85820F7B72D0926FC9b05b43E359b7ee",
+    "quoteAssetAddress": "0x7f39C581F595B53c5cb19bD0b3f8dA6c935E2Ca0",
+    "baseAmount": None,
+    "quoteAmount": "100000000000",
+    "quoteAssetReceiverAddress": None,
+    "ttlMsecs": 5000,
+}
+
+
+def make_event(quote_id: int):
+    components = MockHourglassServer.build_order_components(
+        RFQ, {"quoteId": quote_id, "baseAmount": "112000000000"}
+    )
+    return {
+        "rfqId": quote_id,
+        "quoteId": quote_id,
+        "seaportOrderComponents": components,
+    }
+
+
+async def ticker(stalls: LatencyHistogram, stop: asyncio.Event):
+    """Sleep 1 ms at a time and record how late every wake-up is"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.001)
+        stalls.record(time.perf_counter() - started - 0.001)
+
+
+async def run(service: SigningService, bursts: int, burst_size: int):
+    ns = IonDeleverageMakerNamespace("/maker", set_access_token=lambda token: None)
+    ns.pkey = PKEY
+    ns.address = Account.from_key(PKEY).address
+    ns.signing_service = service
+    if service is not None:
+        await service.start()
+
+    events = [make_event(i) for i in range(burst_size)]
+    latency, stalls = LatencyHistogram(), LatencyHistogram()
+    stop = asyncio.Event()
+    ticker_task = asyncio.create_task(ticker(stalls, stop))
+
+    async def handle(event):
+        started = time.perf_counter()
+        ack = await ns.on_QuoteAccepted(event)
+        latency.record(time.perf_counter() - started)
+        return ack
+
+    started = time.perf_counter()
+    for _ in range(bursts):
+        acks = await asyncio.gather(*(handle(copy.deepcopy(e)) for e in events))
+        assert all(ack["signature"] for ack in acks)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker_task
+    if service is not None:
+        service.close(wait=True)
+    return {
+        "sigs_per_s": bursts * burst_size / elapsed,
+        "p50": latency.percentile(50),
+        "p99": latency.percentile(99),
+        "max_stall": stalls.max_us / 1000 if stalls.max_us else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bursts", type=int, default=10)
+    parser.add_argument("--burst-size", type=int, default=50)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} cpus, {args.bursts} bursts of {args.burst_size} events")
+    print(f"{'mode':<12}{'sigs/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'max stall ms':>14}")
+    modes = [("inline", None)]
+    for executor in ("thread", "process"):
+        for workers in args.workers:
+            modes.append((f"{executor}x{workers}", (executor, workers)))
+    for name, config in modes:
+        service = None
+        if config is not None:
+            service = SigningService(workers=config[1], executor=config[0])
+        r = asyncio.run(run(service, args.bursts, args.burst_size))
+        print(
+            f"{name:<12}{r['sigs_per_s']:>10.0f}{r['p50']:>10.2f}{r['p99']:>10.2f}"
+            f"{r['max_stall']:>14.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
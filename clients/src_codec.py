@@ -0,0 +1,104 @@
+import json
+import socketio
+from typing import Literal
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # optional dependency
+    msgspec = None
+
+Codec = Literal["json", "orjson", "msgspec"]
+
+# orjson and msgspec decode ints that do not fit in 64 bits as floats, which loses
+# precision on uint256 amounts. Only such ints or real floats at least this large decode to
+# floats this large, so payloads holding one are decoded again with the stdlib.
+_WIDE_FLOAT = float(2**63)
+
+
+def _has_wide_float(obj) -> bool:
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        kind = type(obj)
+        if kind is dict:
+            stack.extend(obj.values())
+        elif kind is list:
+            stack.extend(obj)
+        elif kind is float and (obj >= _WIDE_FLOAT or obj <= -_WIDE_FLOAT):
+            return True
+    return False
+
+
+class OrjsonCodec:
+    """json-module compatible wrapper around orjson.
+
+    socket.io calls dumps with stdlib keyword arguments (e.g. separators) and expects a str
+    back. orjson always emits compact output, so those arguments are only used when falling
+    back to the stdlib for values orjson cannot encode (e.g. ints wider than 64 bits).
+    Payloads holding such ints are decoded with the stdlib as well, since orjson returns
+    them as floats.
+    """
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError("orjson is not installed, run `pip install orjson`")
+
+    @staticmethod
+    def dumps(obj, **kwargs) -> str:
+        try:
+            return orjson.dumps(obj).decode()
+        except TypeError:
+            return json.dumps(obj, **kwargs)
+
+    @staticmethod
+    def loads(s, **kwargs):
+        obj = orjson.loads(s)
+        if _has_wide_float(obj):
+            return json.loads(s, **kwargs)
+        return obj
+
+
+class MsgspecCodec:
+    """json-module compatible wrapper around msgspec.json, see OrjsonCodec"""
+
+    def __init__(self):
+        if msgspec is None:
+            raise ImportError("msgspec is not installed, run `pip install msgspec`")
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+
+    def dumps(self, obj, **kwargs) -> str:
+        try:
+            return self._encoder.encode(obj).decode()
+        except (TypeError, OverflowError, msgspec.EncodeError):
+            return json.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        obj = self._decoder.decode(s)
+        if _has_wide_float(obj):
+            return json.loads(s, **kwargs)
+        return obj
+
+
+def get_json_codec(codec: Codec = "json"):
+    if codec == "json":
+        return json
+    if codec == "orjson":
+        return OrjsonCodec()
+    if codec == "msgspec":
+        return MsgspecCodec()
+    raise ValueError(f"Unknown codec: {codec}")
+
+
+def create_client(codec: Codec = "json", **kwargs) -> socketio.AsyncClient:
+    """Create a socket.io client whose packets are encoded and decoded with `codec`.
+
+    Note that python-socketio installs the json module on its packet classes, so the codec
+    applies to every socket.io client and namespace (/maker, /taker, /data) in the process.
+    """
+    return socketio.AsyncClient(json=get_json_codec(codec), **kwargs)
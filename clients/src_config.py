@@ -6,6 +6,10 @@ token_b = "0xEDadeB304ebc9e87655F607DE495D024BCD4C310"
 weETH = "0xCd5fE23C85820F7B72D0926FC9b05b43E359b7ee"
 wstETH = "0x7f39C581F595B53c5cb19bD0b3f8dA6c935E2Ca0"
 
+# CONTRACTS
+SEAPORT_ADDRESS = "0x00000000000000ADc04C56Bf30aC9d3c0aAF14dC"  # Seaport 1.5
+CONDUIT_KEY = "0xa8c94ae38b04140794a9394b76ac6d0a83ac0b02000000000000000000000000"
+
 # ------------------------- USERS -------------------------
 
 # Taker API Users
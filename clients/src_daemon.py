@@ -0,0 +1,353 @@
+"""Headless maker, taker and data clients.
+
+Usage:
+    python -m src_daemon maker --env staging --user Wintermute --market 1 \\
+        --strategy src_strategies:IonDeleverageMakerNamespace
+    python -m src_daemon taker --env staging --user ion-protocol \\
+        --strategy src_strategies:IonTakerNamespace
+    python -m src_daemon data --env staging
+
+Each client runs directly on its own event loop (uvloop when installed), so handlers and
+actions run without the notebooks' cross-thread hop through run_coroutine_threadsafe.
+--strategy names a subclass of the role's base namespace as module:Class. If the strategy
+defines `async def run(self)`, it is started once connected and cancelled on shutdown.
+A maker given --pricer module:function quotes every RFQ through a QuotingEngine.
+Makers sign accepted quotes in a --signing-workers pool, off the event loop, with their
+Seaport counter loaded from --rpc-url at startup and kept current from CounterIncremented logs.
+Quoting, signing and accepting run earliest-deadline-first on a DeadlineScheduler, which
+sheds work for RFQs whose ttlMsecs has passed.
+
+The connection is kept up by a ConnectionSupervisor, with access tokens cached on disk.
+Makers rejoin their --market subscriptions after every reconnect. SIGINT and SIGTERM leave
+the markets, disconnect and exit cleanly. A taker given --execute fills every order it
+receives through an ExecutionPipeline, batching up to --batch-size orders in one
+fulfillAvailableOrders transaction. Private keys are read from the environment variable
+named by --pkey-env, never from the command line.
+"""
+
+import argparse
+import asyncio
+import importlib
+import logging
+import os
+import signal
+from eth_account import Account
+from typing import Any, Dict, Optional, Type
+from web3 import Web3, HTTPProvider
+from web3.middleware import geth_poa_middleware
+from src_codec import create_client
+from src_config import (
+    get_maker_api_user,
+    get_taker_api_protocol_user,
+    get_taker_api_wallet_user,
+)
+from src_data import DataNamespace
+from src_execution import (
+    DEFAULT_BATCH_WINDOW,
+    DEFAULT_EXECUTION_WORKERS,
+    ExecutionPipeline,
+    create_async_web3,
+)
+from src_logging import configure_logging, get_logger
+from src_maker import MakerNamespaceBase, leave_markets
+from src_quoting import Pricer, QuotingEngine
+from src_recorder import TrafficRecorder
+from src_rpc import JsonRpcNamespace
+from src_runtime import get_server_url, new_event_loop
+from src_scheduler import DeadlineScheduler
+from src_seaport import CounterCache
+from src_signing import DEFAULT_SIGNING_WORKERS, SigningService
+from src_supervisor import ConnectionSupervisor
+from src_taker import TakerNamespaceBase
+from src_token_cache import TokenCache
+
+logger = get_logger(__name__)
+
+ROLES: Dict[str, Type[JsonRpcNamespace]] = {
+    "maker": MakerNamespaceBase,
+    "taker": TakerNamespaceBase,
+    "data": DataNamespace,
+}
+# Seconds allowed for leaving markets on shutdown
+SHUTDOWN_TIMEOUT = 5.0
+# Environment variables holding the private key, unless --pkey-env names another
+DEFAULT_PKEY_ENVS = {"maker": "MAKER_PRIVATE_KEY", "taker": "TAKER_PRIVATE_KEY"}
+
+
+def load_strategy(spec: Optional[str], role: str) -> Type[JsonRpcNamespace]:
+    """Import a namespace class given as module:Class, defaulting to the role's base class"""
+    base = ROLES[role]
+    if spec is None:
+        return base
+    module_name, sep, class_name = spec.partition(":")
+    if not sep or not module_name or not class_name:
+        raise ValueError(f"Strategy must be given as module:Class, got {spec!r}")
+    strategy = getattr(importlib.import_module(module_name), class_name)
+    if not (isinstance(strategy, type) and issubclass(strategy, base)):
+        raise TypeError(f"{spec} is not a subclass of {base.__name__}")
+    return strategy
+
+
+def load_pricer(spec: str) -> Pricer:
+    """Import a pricing function given as module:function"""
+    module_name, sep, function_name = spec.partition(":")
+    if not sep or not module_name or not function_name:
+        raise ValueError(f"Pricer must be given as module:function, got {spec!r}")
+    pricer = getattr(importlib.import_module(module_name), function_name)
+    if not callable(pricer):
+        raise TypeError(f"{spec} is not callable")
+    return pricer
+
+
+def get_auth(args) -> Dict[str, Any]:
+    if args.role == "maker":
+        user = get_maker_api_user(args.user)
+        return {"clientId": user["clientId"], "clientSecret": user["clientSecret"]}
+    if args.role == "taker" and args.wallet_user:
+        user = get_taker_api_wallet_user(args.user)
+        return {"clientId": user["clientId"], "clientSecret": user["clientSecret"]}
+    if args.role == "taker":
+        user = get_taker_api_protocol_user(args.user)
+        return {"source": user["source"], "secret": user["secret"]}
+    return {}
+
+
+def create_namespace(args, supervisor: ConnectionSupervisor) -> JsonRpcNamespace:
+    strategy = load_strategy(args.strategy, args.role)
+    namespace = f"/{args.role}"
+    if args.role == "data":
+        return strategy(namespace)
+    ns = strategy(namespace, set_access_token=supervisor.set_access_token)
+    # Quoting, signing and accepting share one earliest-deadline-first scheduler
+    ns.scheduler = DeadlineScheduler(max_concurrency=args.max_quoting)
+    if args.role == "maker":
+        pkey = get_private_key(args)
+        ns.pkey = pkey
+        ns.address = args.address or Account.from_key(pkey).address
+        ns.signing_service = SigningService(
+            workers=args.signing_workers, executor=args.signing_executor
+        )
+        if args.pricer:
+            ns.quoting_engine = QuotingEngine(ns, load_pricer(args.pricer))
+    if args.rpc_url:
+        w3 = Web3(HTTPProvider(args.rpc_url))
+        # Add middleware to handle Proof-of-Authority
+        w3.middleware_onion.inject(geth_poa_middleware, layer=0)
+        ns.w3 = w3
+        if args.role == "maker":
+            ns.counter_cache = CounterCache(w3)
+    if args.execute:
+        if args.role != "taker" or not hasattr(ns, "execution_pipeline"):
+            raise ValueError("--execute needs a taker strategy that fills orders")
+        if not args.rpc_url:
+            raise ValueError("--execute needs --rpc-url")
+        ns.execution_pipeline = ExecutionPipeline(
+            create_async_web3(args.rpc_url),
+            get_private_key(args),
+            workers=args.execution_workers,
+            batch_size=args.batch_size,
+            batch_window=args.batch_window,
+        )
+    return ns
+
+
+def get_private_key(args) -> str:
+    pkey_env = args.pkey_env or DEFAULT_PKEY_ENVS[args.role]
+    pkey = os.environ.get(pkey_env)
+    if not pkey:
+        raise ValueError(f"Set the {args.role}'s private key in ${pkey_env}")
+    return pkey
+
+
+async def run_strategy(ns: JsonRpcNamespace, supervisor: ConnectionSupervisor):
+    await supervisor.connected.wait()
+    try:
+        await ns.run()
+    except Exception:
+        logger.exception("Strategy %s failed", type(ns).__name__)
+        raise
+
+
+async def run(args):
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    server_url = get_server_url(args.env)
+    # socketio's own SIGINT handler would disconnect first and bypass the graceful shutdown
+    sio = create_client(args.codec, handle_sigint=False)
+    token_cache = token_key = None
+    if args.role != "data":
+        token_cache = TokenCache()
+        token_key = TokenCache.key(args.env, args.role, args.user)
+    supervisor = ConnectionSupervisor(
+        sio,
+        server_url,
+        auth=get_auth(args),
+        namespaces=[f"/{args.role}"],
+        token_cache=token_cache,
+        token_key=token_key,
+    )
+    ns = create_namespace(args, supervisor)
+    sio.register_namespace(ns)
+    recorder = None
+    if args.record:
+        recorder = TrafficRecorder(args.record)
+        recorder.attach(ns)
+
+    if args.role == "maker":
+        # Joined by resubscribe() on every connect, including the first one
+        ns.subscribed_markets.update(args.market)
+
+    strategy_task = counter_task = None
+    try:
+        logger.info("Starting %s client %s", args.role, type(ns).__name__)
+        if getattr(ns, "signing_service", None) is not None:
+            await ns.signing_service.start()
+        if getattr(ns, "counter_cache", None) is not None:
+            await asyncio.to_thread(ns.counter_cache.load, [ns.address])
+            counter_task = asyncio.create_task(ns.counter_cache.watch())
+        elif args.role == "maker":
+            logger.warning("No --rpc-url, orders are signed with Seaport counter 0")
+        # Don't wait for the connection here, a signal must still stop a daemon that
+        # cannot reach the server
+        await supervisor.start(wait=False)
+        if hasattr(ns, "run"):
+            strategy_task = asyncio.create_task(run_strategy(ns, supervisor))
+            strategy_task.add_done_callback(lambda task: stop.set())
+        await stop.wait()
+    finally:
+        logger.info("Shutting down %s client", args.role)
+        if strategy_task is not None and not strategy_task.done():
+            strategy_task.cancel()
+            await asyncio.gather(strategy_task, return_exceptions=True)
+        if counter_task is not None:
+            counter_task.cancel()
+            await asyncio.gather(counter_task, return_exceptions=True)
+        if getattr(ns, "quoting_engine", None) is not None:
+            await ns.quoting_engine.close()
+            logger.info("Quoting stats: %s", ns.quoting_engine.stats())
+        if getattr(ns, "scheduler", None) is not None:
+            await ns.scheduler.close()
+            logger.info(
+                "Scheduler shed %d expired jobs: %s",
+                ns.scheduler.shed,
+                ns.scheduler.stats(),
+            )
+        if getattr(ns, "execution_pipeline", None) is not None:
+            await ns.execution_pipeline.close()
+            logger.info("Execution stats: %s", ns.execution_pipeline.stats())
+        if getattr(ns, "signing_service", None) is not None:
+            ns.signing_service.close()
+            logger.info("Signing stats: %s", ns.signing_service.stats())
+        if (
+            isinstance(ns, MakerNamespaceBase)
+            and ns.subscribed_markets
+            and sio.connected
+        ):
+            try:
+                await leave_markets(
+                    ns, sio, sorted(ns.subscribed_markets), timeout=SHUTDOWN_TIMEOUT
+                )
+            except Exception as e:
+                logger.warning("Failed to leave markets on shutdown: %s", e)
+        await supervisor.stop()
+        if recorder is not None:
+            recorder.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("role", choices=sorted(ROLES))
+    parser.add_argument("--env", default="local", choices=["local", "staging"])
+    parser.add_argument(
+        "--user", help="maker user name, or taker protocol (or wallet user) name"
+    )
+    parser.add_argument(
+        "--wallet-user",
+        action="store_true",
+        help="taker authenticates as a wallet user",
+    )
+    parser.add_argument("--strategy", help="namespace class as module:Class")
+    parser.add_argument(
+        "--market", type=int, action="append", default=[], help="market id to join"
+    )
+    parser.add_argument(
+        "--address", help="maker address, derived from the key if unset"
+    )
+    parser.add_argument(
+        "--pkey-env",
+        help="environment variable with the private key, "
+        "MAKER_PRIVATE_KEY or TAKER_PRIVATE_KEY by default",
+    )
+    parser.add_argument(
+        "--pricer", help="maker pricing function as module:function, quotes every RFQ"
+    )
+    parser.add_argument(
+        "--max-quoting",
+        type=int,
+        default=32,
+        help="RFQs priced, signed or accepted concurrently",
+    )
+    parser.add_argument(
+        "--execute",
+        action="store_true",
+        help="taker fills orders as they are created, needs --rpc-url",
+    )
+    parser.add_argument(
+        "--execution-workers",
+        type=int,
+        default=DEFAULT_EXECUTION_WORKERS,
+        help="taker orders broadcast concurrently",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1,
+        help="taker fills up to this many orders per fulfillAvailableOrders transaction",
+    )
+    parser.add_argument(
+        "--batch-window",
+        type=float,
+        default=DEFAULT_BATCH_WINDOW,
+        help="seconds to wait for more orders to batch with the first",
+    )
+    parser.add_argument(
+        "--signing-workers",
+        type=int,
+        default=DEFAULT_SIGNING_WORKERS,
+        help="maker order signing workers",
+    )
+    parser.add_argument(
+        "--signing-executor", default="thread", choices=["thread", "process"]
+    )
+    parser.add_argument(
+        "--rpc-url",
+        help="JSON-RPC node for strategies that use w3 and makers' Seaport counters",
+    )
+    parser.add_argument(
+        "--codec", default="json", choices=["json", "orjson", "msgspec"]
+    )
+    parser.add_argument("--loop", default="auto", choices=["auto", "asyncio", "uvloop"])
+    parser.add_argument(
+        "--record", help="record traffic to this file (.gz to compress)"
+    )
+    parser.add_argument("--log-level", default="INFO")
+    parser.add_argument("--log-file")
+    parser.add_argument("--structured-logs", action="store_true")
+    args = parser.parse_args(argv)
+    if args.role != "data" and not args.user:
+        parser.error(f"--user is required for the {args.role} role")
+
+    configure_logging(
+        logging.getLevelName(args.log_level.upper()),
+        filename=args.log_file,
+        structured=args.structured_logs,
+    )
+    with asyncio.Runner(loop_factory=lambda: new_event_loop(args.loop)) as runner:
+        runner.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
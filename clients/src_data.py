@@ -0,0 +1,53 @@
+import socketio
+from typing import Optional
+from src_shared import request_message
+from src_rpc import DEFAULT_REQUEST_TIMEOUT, JsonRpcNamespace
+from src_logging import LazyJson, get_logger
+
+logger = get_logger(__name__)
+
+_NAMESPACE = "/data"
+
+
+def get_namespace_and_server_url(env: str) -> [str, str]:
+    if env == "local":
+        return _NAMESPACE, f"ws://localhost:3100{_NAMESPACE}"
+    if env == "staging":
+        return _NAMESPACE, f"wss://api-origin-staging-v2.hourglass.com{_NAMESPACE}"
+    raise ValueError(f"Unknown environment: {env}")
+
+
+# ------------------------------ BASE NAMESPACE ------------------------------
+
+
+class DataNamespace(JsonRpcNamespace):
+
+    # ------------------------------ Event Handlers ------------------------------
+
+    def on_connect(self):
+        logger.info("EVENT [connect]: Connected to the data server.")
+
+    def on_disconnect(self):
+        logger.info("EVENT [disconnect]: Disconnected from the data server.")
+
+    # ------------------------------ JSONRPC Method Handlers ------------------------------
+    # These can be overwritten in subclasses to handle successful responses idiosyncratically.
+    # Subclasses can handle additional methods by defining handle_successful_<method>.
+
+    def handle_successful_hg_getMarkets(self, result):
+        logger.info("Successfully got markets %s", LazyJson(result))
+
+
+# ------------------------------ ACTION FUNCTIONS ------------------------------
+
+
+async def get_markets(
+    ns: socketio.AsyncClientNamespace,
+    sio: socketio.AsyncClient,
+    *,
+    timeout: Optional[float] = DEFAULT_REQUEST_TIMEOUT,
+):
+    method = "hg_getMarkets"
+    params = {}
+    logger.debug("Attempting to get markets")
+    return await request_message(ns, sio, method, params, timeout=timeout)
@@ -0,0 +1,325 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+from web3 import AsyncHTTPProvider, AsyncWeb3
+from web3.exceptions import TimeExhausted, TransactionNotFound
+from web3.middleware import async_geth_poa_middleware
+from src_logging import get_logger
+from src_metrics import LatencyHistogram
+from src_nonce import NonceManager, is_nonce_error
+from src_shared import (
+    get_account,
+    log_receipt_status,
+    send_order_async,
+    send_orders_async,
+)
+from src_taker import Order
+
+logger = get_logger(__name__)
+
+DEFAULT_EXECUTION_WORKERS = 4
+# Orders waiting for a worker beyond this are rejected
+DEFAULT_MAX_QUEUED_ORDERS = 1000
+# Seconds between new block checks, and before a broadcast fill is given up on
+DEFAULT_RECEIPT_POLL_INTERVAL = 1.0
+DEFAULT_INCLUSION_TIMEOUT = 120.0
+# Times a fill is rebuilt with a resynced nonce after the node rejected its nonce
+MAX_NONCE_RETRIES = 2
+# Seconds a batching worker waits for more orders after the first
+DEFAULT_BATCH_WINDOW = 0.05
+
+
+def create_async_web3(rpc_url: str) -> AsyncWeb3:
+    w3 = AsyncWeb3(AsyncHTTPProvider(rpc_url))
+    # Add middleware to handle Proof-of-Authority
+    w3.middleware_onion.inject(async_geth_poa_middleware, layer=0)
+    return w3
+
+
+class ReceiptWatcher:
+    """Awaitable receipts for any number of transactions in flight.
+
+    watch() returns a future resolved with the transaction's receipt, or failed with
+    TimeExhausted after `timeout` seconds. A single task polls the block number every
+    `poll_interval` and fetches the receipts of every pending transaction concurrently when
+    a new block arrives, instead of each waiter polling eth_getTransactionReceipt on its own.
+    """
+
+    def __init__(
+        self,
+        w3: AsyncWeb3,
+        *,
+        poll_interval: float = DEFAULT_RECEIPT_POLL_INTERVAL,
+        timeout: float = DEFAULT_INCLUSION_TIMEOUT,
+    ):
+        self.w3 = w3
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self._pending: Dict[bytes, Tuple[asyncio.Future, float]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def watch(self, txn_hash) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._pending[bytes(txn_hash)] = (future, time.monotonic() + self.timeout)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._poll())
+        return future
+
+    def __len__(self):
+        return len(self._pending)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        for future, _ in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+
+    async def _poll(self):
+        last_block = None
+        while self._pending:
+            try:
+                block = await self.w3.eth.block_number
+                if block != last_block:
+                    last_block = block
+                    await self._fetch_receipts()
+            except Exception as e:
+                logger.warning("Failed to poll for receipts: %s", e)
+            self._expire()
+            if self._pending:
+                await asyncio.sleep(self.poll_interval)
+
+    async def _fetch_receipts(self):
+        hashes = list(self._pending)
+        receipts = await asyncio.gather(
+            *(self.w3.eth.get_transaction_receipt(h) for h in hashes),
+            return_exceptions=True,
+        )
+        for txn_hash, receipt in zip(hashes, receipts):
+            if isinstance(receipt, TransactionNotFound):
+                continue
+            if isinstance(receipt, Exception):
+                logger.warning(
+                    "Failed to get receipt of %s: %s", txn_hash.hex(), receipt
+                )
+                continue
+            future, _ = self._pending.pop(txn_hash)
+            if not future.done():
+                future.set_result(receipt)
+
+    def _expire(self):
+        now = time.monotonic()
+        for txn_hash, (future, deadline) in list(self._pending.items()):
+            if future.done():  # the waiter gave up
+                del self._pending[txn_hash]
+            elif now >= deadline:
+                del self._pending[txn_hash]
+                future.set_exception(
+                    TimeExhausted(f"{txn_hash.hex()} not mined in {self.timeout}s")
+                )
+
+
+class ExecutionPipeline:
+    """Fills orders from OrderCreated without blocking the socket.io event loop.
+
+    Orders are queued by submit() and taken by `workers` executor tasks, which build, sign
+    and broadcast the fulfillOrder transaction on AsyncWeb3. Inclusion of every broadcast
+    transaction is awaited through a shared ReceiptWatcher, so a worker moves on to the next
+    order instead of waiting for the block and dozens of fills can be in flight at once.
+    Nonces come from a NonceManager and the chain id is fetched once, so back to back fills
+    need no RPC besides eth_sendRawTransaction. A fill whose nonce the node rejects is
+    retried after a resync, and a fill that is never mined (dropped or replaced) resyncs the
+    nonce so that the next fill closes the gap.
+
+    With `batch_size` above 1 a worker collects the orders arriving within `batch_window`
+    seconds of the first one, up to `batch_size`, and fills them in one
+    fulfillAvailableOrders transaction, which spreads the base gas and the RPC round trip
+    over the batch during bursts. Seaport skips orders of a batch that are no longer
+    available rather than reverting, so those still count as included.
+
+    Time from the order reaching the client to broadcast and to inclusion is recorded in
+    `receipt_to_broadcast` and `receipt_to_inclusion`.
+
+    Usage:
+        ns.execution_pipeline = ExecutionPipeline(create_async_web3(rpc_url), pkey)
+        ns.execution_pipeline.submit(order)
+    """
+
+    def __init__(
+        self,
+        w3: AsyncWeb3,
+        pkey: str,
+        *,
+        workers: int = DEFAULT_EXECUTION_WORKERS,
+        max_queued: int = DEFAULT_MAX_QUEUED_ORDERS,
+        poll_interval: float = DEFAULT_RECEIPT_POLL_INTERVAL,
+        inclusion_timeout: float = DEFAULT_INCLUSION_TIMEOUT,
+        nonces: Optional[NonceManager] = None,
+        batch_size: int = 1,
+        batch_window: float = DEFAULT_BATCH_WINDOW,
+    ):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.w3 = w3
+        self.pkey = pkey
+        self.address = get_account(pkey).address
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.nonces = nonces or NonceManager(w3)
+        self._chain_id: Optional[asyncio.Task] = None
+        self.receipts = ReceiptWatcher(
+            w3, poll_interval=poll_interval, timeout=inclusion_timeout
+        )
+        self.receipt_to_broadcast = LatencyHistogram()
+        self.receipt_to_inclusion = LatencyHistogram()
+        self._queue: "asyncio.Queue[Tuple[Order, float]]" = asyncio.Queue(max_queued)
+        self._workers: List[asyncio.Task] = []
+        self._confirmations: Set[asyncio.Task] = set()
+        # stats
+        self.received = 0
+        self.rejected = 0
+        self.broadcast = 0
+        self.transactions = 0
+        self.included = 0
+        self.reverted = 0
+        self.failed = 0
+        self.nonce_retries = 0
+
+    def submit(self, order: Order, received_at: Optional[float] = None):
+        """Queue an order for execution, called from on_OrderCreated"""
+        received_at = time.monotonic() if received_at is None else received_at
+        self.received += 1
+        if not self._workers:
+            self._workers = [
+                asyncio.create_task(self._work()) for _ in range(self.workers)
+            ]
+        try:
+            self._queue.put_nowait((order, received_at))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            logger.warning("Execution queue full, rejecting order")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "received": self.received,
+            "rejected": self.rejected,
+            "broadcast": self.broadcast,
+            "transactions": self.transactions,
+            "included": self.included,
+            "reverted": self.reverted,
+            "failed": self.failed,
+            "nonce_retries": self.nonce_retries,
+            "nonce_syncs": self.nonces.syncs,
+            "queued": self._queue.qsize(),
+            "unconfirmed": len(self._confirmations),
+            "receipt_to_broadcast_ms": self.receipt_to_broadcast.summary(),
+            "receipt_to_inclusion_ms": self.receipt_to_inclusion.summary(),
+        }
+
+    async def join(self):
+        """Wait until every queued order has been broadcast and confirmed"""
+        await self._queue.join()
+        while self._confirmations:
+            await asyncio.gather(*self._confirmations, return_exceptions=True)
+
+    async def close(self):
+        """Stop the workers; queued orders are dropped, broadcast ones stay unconfirmed"""
+        tasks = [*self._workers, *self._confirmations]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        await self.receipts.close()
+
+    async def _work(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                txn_hash = await self._broadcast([order for order, _ in batch])
+            except Exception:
+                self.failed += len(batch)
+                logger.exception("Failed to broadcast fill of %d orders", len(batch))
+                continue
+            else:
+                now = time.monotonic()
+                self.transactions += 1
+                self.broadcast += len(batch)
+                for _, received_at in batch:
+                    self.receipt_to_broadcast.record(now - received_at)
+                task = asyncio.create_task(
+                    self._confirm(txn_hash, [received_at for _, received_at in batch])
+                )
+                self._confirmations.add(task)
+                task.add_done_callback(self._confirmations.discard)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _next_batch(self) -> List[Tuple[Order, float]]:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _broadcast(self, orders: List[Order]):
+        if self._chain_id is None or (
+            self._chain_id.done()
+            and (self._chain_id.cancelled() or self._chain_id.exception() is not None)
+        ):
+            # Shared by the workers, and fetched again by the next fill if it failed
+            self._chain_id = asyncio.ensure_future(self.w3.eth.chain_id)
+        chain_id = await asyncio.shield(self._chain_id)
+        for attempt in range(MAX_NONCE_RETRIES + 1):
+            nonce = await self.nonces.allocate(self.address)
+            try:
+                if len(orders) == 1:
+                    return await send_order_async(
+                        self.w3, orders[0], self.pkey, nonce=nonce, chain_id=chain_id
+                    )
+                return await send_orders_async(
+                    self.w3, orders, self.pkey, nonce=nonce, chain_id=chain_id
+                )
+            except Exception as e:
+                if not is_nonce_error(e):
+                    # Not broadcast, the next fill can take the nonce
+                    self.nonces.release(self.address, nonce)
+                    raise
+                if attempt == MAX_NONCE_RETRIES:
+                    raise
+                logger.warning("Nonce %d rejected (%s), resyncing", nonce, e)
+                self.nonce_retries += 1
+                await self.nonces.resync(self.address, nonce)
+
+    async def _confirm(self, txn_hash, received_ats: List[float]):
+        try:
+            receipt = await self.receipts.watch(txn_hash)
+        except TimeExhausted as e:
+            self.failed += len(received_ats)
+            logger.error("Fill %s", e)
+            # The transaction was dropped or replaced, or is stuck behind one that was
+            await self.nonces.resync(self.address)
+            return
+        now = time.monotonic()
+        for order_received_at in received_ats:
+            self.receipt_to_inclusion.record(now - order_received_at)
+        log_receipt_status(receipt)
+        if receipt["status"] == 1:
+            self.included += len(received_ats)
+        else:
+            self.reverted += len(received_ats)
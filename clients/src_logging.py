@@ -0,0 +1,107 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+from typing import Any, Optional
+
+LOGGER_NAME = "hourglass"
+DEFAULT_FORMAT = "%(asctime)s %(levelname)s [%(name)s] %(message)s"
+
+# Attributes present on every LogRecord, anything else was passed through `extra`
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+
+class LazyJson:
+    """Log argument that serializes its payload only if the record is actually emitted.
+
+    Usage: logger.debug("Received RFQ: %s", LazyJson(data, indent=4))
+    """
+
+    __slots__ = ("obj", "indent")
+
+    def __init__(self, obj: Any, indent: Optional[int] = None):
+        self.obj = obj
+        self.indent = indent
+
+    def __str__(self):
+        return json.dumps(self.obj, indent=self.indent, default=str)
+
+
+class StructuredFormatter(logging.Formatter):
+    """Format records as one JSON object per line, including any fields passed via `extra`"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(
+    level: int = logging.INFO,
+    *,
+    filename: Optional[str] = None,
+    console: bool = True,
+    structured: bool = False,
+) -> logging.handlers.QueueListener:
+    """Send all client logs through a queue so console and file I/O happen off the event loop.
+
+    Callers only pay for the level check and, for enabled records, for formatting the message
+    (done on the calling thread so later mutation of the logged payload cannot race with it).
+    Writing is done by a QueueListener thread. Calling this again replaces the configuration.
+    """
+    global _listener
+    stop_logging()
+
+    formatter = (
+        StructuredFormatter() if structured else logging.Formatter(DEFAULT_FORMAT)
+    )
+    handlers = []
+    if console:
+        handlers.append(logging.StreamHandler())
+    if filename:
+        handlers.append(logging.FileHandler(filename))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(
+        log_queue, *handlers, respect_handler_level=True
+    )
+    _listener.start()
+
+    logger = logging.getLogger(LOGGER_NAME)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    logger.setLevel(level)
+    logger.propagate = False
+    return _listener
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(stop_logging)
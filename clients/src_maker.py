@@ -1,12 +1,19 @@
 import socketio
-from src_shared import emit_message
-import json
+import time
+from typing import Any, Dict, List, Optional
+from src_shared import request_batch, request_message
+from src_rpc import DEFAULT_REQUEST_TIMEOUT, JsonRpcNamespace
+from src_logging import LazyJson, get_logger
+from src_scheduler import DeadlineTable, rfq_deadline
+from src_token_cache import describe_token
 from src_taker import (
     Order,
 )
 
 _NAMESPACE = "/maker"
 
+logger = get_logger(__name__)
+
 
 def get_namespace_and_server_url(env: str) -> [str, str]:
     if env == "local":
@@ -19,7 +26,7 @@ def get_namespace_and_server_url(env: str) -> [str, str]:
 # ------------------------------ BASE NAMESPACE ------------------------------
 
 
-class MakerNamespaceBase(socketio.AsyncClientNamespace):
+class MakerNamespaceBase(JsonRpcNamespace):
 
     def __init__(self, *args, **kwargs):
         set_access_token = kwargs.get("set_access_token", None)
@@ -29,8 +36,19 @@ class MakerNamespaceBase(socketio.AsyncClientNamespace):
 
         super().__init__(*args, **kwargs)
 
-        self.sent_messages = {}
         self.accepted_quotes = []
+        # Markets joined through join_market(s), replayed by resubscribe after a reconnect
+        self.subscribed_markets = set()
+        # Set to a QuotingEngine to quote every RFQ broadcast automatically
+        self.quoting_engine = None
+        # Set to a DeadlineScheduler to sign accepted quotes earliest-deadline-first
+        self.scheduler = None
+        # Set to a SigningService to sign accepted quotes off the event loop
+        self.signing_service = None
+        # Set to a CounterCache to sign with the offerer's current Seaport counter, not 0
+        self.counter_cache = None
+        # Deadlines of broadcast RFQs, for QuoteAccepted which only carries the rfqId
+        self.rfq_deadlines = DeadlineTable()
         self.address = None  # must be set
         self.pkey = None  # must be set
         self.set_access_token = set_access_token
@@ -38,98 +56,103 @@ class MakerNamespaceBase(socketio.AsyncClientNamespace):
     # ------------------------------ Event Handlers ------------------------------
 
     def on_connect(self):
-        print(f"EVENT [connect]: Connected to the {self.namespace} namespace.")
+        logger.info("EVENT [connect]: Connected to the %s namespace.", self.namespace)
 
     def on_disconnect(self):
-        print(f"EVENT [disconnect]: Disconnected from the {self.namespace} namespace.")
+        logger.info(
+            "EVENT [disconnect]: Disconnected from the %s namespace.", self.namespace
+        )
 
     # ------------------------------ Event Handlers ------------------------------
 
     def on_AccessToken(self, data):
-        print(f"EVENT [AccessToken]: Received access token: {data}")
+        logger.debug(
+            "EVENT [AccessToken]: Received access token (%s)",
+            describe_token(data["accessToken"]),
+        )
         self.set_access_token(data["accessToken"])
         return "ACK"
 
     def on_RequestForQuoteBroadcast(self, data):
-        print(
-            f"EVENT [RequestForQuoteBroadcast]: Received RFQ: {json.dumps(data, indent=4)}"
+        logger.debug(
+            "EVENT [RequestForQuoteBroadcast]: Received RFQ: %s",
+            LazyJson(data, indent=4),
         )
+        received_at = time.monotonic()
+        self.rfq_deadlines.add(data.get("rfqId"), rfq_deadline(data, received_at))
+        if self.quoting_engine is not None:
+            self.quoting_engine.submit(data, received_at)
         return "ACK"
 
     def on_OrderFulfilled(self, data):
-        print(
-            f"EVENT [OrderFulfilled]: Received fulfilled order: {json.dumps(data, indent=4)}"
+        logger.debug(
+            "EVENT [OrderFulfilled]: Received fulfilled order: %s",
+            LazyJson(data, indent=4),
         )
         return "ACK"
 
+    async def resubscribe(self):
+        """Join every tracked market again, called by ConnectionSupervisor after reconnecting"""
+        if not self.subscribed_markets:
+            return
+        market_ids = sorted(self.subscribed_markets)
+        logger.info("Resubscribing to markets %s", market_ids)
+        results = await join_markets(self, self.client, market_ids)
+        for market_id, result in zip(market_ids, results):
+            if isinstance(result, BaseException):
+                logger.warning(
+                    "Failed to resubscribe to market %s: %s", market_id, result
+                )
+
     # ------------------------------ JSONRPC Method Handlers ------------------------------
-    # These can be overwritten in subclasses to handle successful responses idiosyncratically
+    # These can be overwritten in subclasses to handle successful responses idiosyncratically.
+    # Subclasses can handle additional methods by defining handle_successful_<method>.
 
     def handle_successful_hg_subscribeToMarket(self, result):
-        print(f"Successfully subscribed to market {result}")
+        logger.info("Successfully subscribed to market %s", result)
 
     def handle_successful_hg_unsubscribeFromMarket(self, result):
-        print(f"Successfully unsubscribed from market {result}")
+        logger.info("Successfully unsubscribed from market %s", result)
 
     def handle_successful_hg_submitQuote(self, result):
-        print(f"Successfully submitted quote {result}")
-
-    # ------------------------------ JSONRPC Method Handlers ------------------------------
-
-    def on_message(self, data):
-        print(f"EVENT [message]: Received message: {data}")
-        msg_id = data["id"]
-        result = data["result"] if "result" in data else None
-        error = data["error"] if "error" in data else None
-        jsonrpc = data["jsonrpc"]
-        if not jsonrpc == "2.0":
-            raise Exception("Invalid JSON-RPC version received from server")
-        # handle response based on sent messages
-        if not msg_id in self.sent_messages:
-            raise Exception(f"Received message with id: {msg_id} that was never sent")
-        ori_msg = self.sent_messages[msg_id]
-        # handle errors
-        if error:
-            print(f"For request {msg_id} received error: {error}")
-            return
-        # handle results
-        if ori_msg["method"] == "hg_subscribeToMarket":
-            self.handle_successful_hg_subscribeToMarket(result)
-        elif ori_msg["method"] == "hg_unsubscribeFromMarket":
-            self.handle_successful_hg_unsubscribeFromMarket(result)
-        elif ori_msg["method"] == "hg_submitQuote":
-            self.handle_successful_hg_submitQuote(result)
-        else:
-            raise Exception(
-                f"Unknown method {ori_msg['method']} in sent message {msg_id}"
-            )
+        logger.info("Successfully submitted quote %s", result)
 
 
 # ------------------------------ ACTION FUNCTIONS ------------------------------
 
 
 async def join_market(
-    ns: socketio.AsyncClientNamespace, sio: socketio.AsyncClient, market_id
+    ns: socketio.AsyncClientNamespace,
+    sio: socketio.AsyncClient,
+    market_id,
+    *,
+    timeout: Optional[float] = DEFAULT_REQUEST_TIMEOUT,
 ):
     method = "hg_subscribeToMarket"
     params = {
         "marketId": market_id,
     }
-    res = await emit_message(ns, sio, method, params)
-    print(f"Attempted to subscribe to market {market_id}")
-    print(res)
+    logger.debug("Attempting to subscribe to market %s", market_id)
+    result = await request_message(ns, sio, method, params, timeout=timeout)
+    ns.subscribed_markets.add(market_id)
+    return result
 
 
 async def leave_market(
-    ns: socketio.AsyncClientNamespace, sio: socketio.AsyncClient, market_id
+    ns: socketio.AsyncClientNamespace,
+    sio: socketio.AsyncClient,
+    market_id,
+    *,
+    timeout: Optional[float] = DEFAULT_REQUEST_TIMEOUT,
 ):
     method = "hg_unsubscribeFromMarket"
     params = {
         "marketId": market_id,
     }
-    res = await emit_message(ns, sio, method, params)
-    print(f"Attempted to unsubscribe to market {market_id}")
-    print(res)
+    logger.debug("Attempting to unsubscribe from market %s", market_id)
+    result = await request_message(ns, sio, method, params, timeout=timeout)
+    ns.subscribed_markets.discard(market_id)
+    return result
 
 
 async def submit_quote(
@@ -139,8 +162,17 @@ async def submit_quote(
     rfq_id,
     base_amount: str = None,
     quote_amount: str = None,
+    timeout: Optional[float] = DEFAULT_REQUEST_TIMEOUT,
 ):
     method = "hg_submitQuote"
+    params = get_quote_params(
+        rfq_id=rfq_id, base_amount=base_amount, quote_amount=quote_amount
+    )
+    logger.debug("Attempting to submit quote for RFQ %s", rfq_id)
+    return await request_message(ns, sio, method, params, timeout=timeout)
+
+
+def get_quote_params(*, rfq_id, base_amount: str = None, quote_amount: str = None):
     params = {
         "rfqId": rfq_id,
     }
@@ -150,6 +182,53 @@ async def submit_quote(
         params["baseAmount"] = base_amount
     else:
         raise ValueError("Either base_amount or quote_amount must be specified")
-    res = await emit_message(ns, sio, method, params)
-    print("Attempted to submit quote.")
-    print(res)
+    return params
+
+
+# ------------------------------ BATCH ACTION FUNCTIONS ------------------------------
+# Each of these sends a single JSON-RPC batch and returns one result (or exception) per item
+
+
+async def join_markets(
+    ns: socketio.AsyncClientNamespace,
+    sio: socketio.AsyncClient,
+    market_ids: List,
+    *,
+    timeout: Optional[float] = DEFAULT_REQUEST_TIMEOUT,
+) -> List[Any]:
+    calls = [("hg_subscribeToMarket", {"marketId": m}) for m in market_ids]
+    logger.debug("Attempting to subscribe to markets %s", market_ids)
+    results = await request_batch(ns, sio, calls, timeout=timeout)
+    for market_id, result in zip(market_ids, results):
+        if not isinstance(result, BaseException):
+            ns.subscribed_markets.add(market_id)
+    return results
+
+
+async def leave_markets(
+    ns: socketio.AsyncClientNamespace,
+    sio: socketio.AsyncClient,
+    market_ids: List,
+    *,
+    timeout: Optional[float] = DEFAULT_REQUEST_TIMEOUT,
+) -> List[Any]:
+    calls = [("hg_unsubscribeFromMarket", {"marketId": m}) for m in market_ids]
+    logger.debug("Attempting to unsubscribe from markets %s", market_ids)
+    results = await request_batch(ns, sio, calls, timeout=timeout)
+    for market_id, result in zip(market_ids, results):
+        if not isinstance(result, BaseException):
+            ns.subscribed_markets.discard(market_id)
+    return results
+
+
+async def submit_quotes(
+    ns: socketio.AsyncClientNamespace,
+    sio: socketio.AsyncClient,
+    quotes: List[Dict[str, Any]],
+    *,
+    timeout: Optional[float] = DEFAULT_REQUEST_TIMEOUT,
+) -> List[Any]:
+    """quotes: keyword arguments of submit_quote, e.g. [{"rfq_id": 1, "base_amount": "..."}]"""
+    calls = [("hg_submitQuote", get_quote_params(**quote)) for quote in quotes]
+    logger.debug("Attempting to submit %d quotes", len(calls))
+    return await request_batch(ns, sio, calls, timeout=timeout)
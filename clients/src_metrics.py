@@ -0,0 +1,155 @@
+import json
+import math
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+DEFAULT_PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+
+
+class LatencyHistogram:
+    """HDR-style log-linear histogram of latencies, recorded with microsecond resolution.
+
+    Values below 2**sub_bucket_bits us are counted exactly. Above that, every power of two is
+    split into 2**(sub_bucket_bits - 1) equal buckets, so a reported value is within
+    1 / 2**(sub_bucket_bits - 1) of the recorded one (under 1.6% with the default of 7 bits)
+    while memory stays proportional to the number of distinct buckets hit. Recording is O(1).
+    """
+
+    def __init__(self, sub_bucket_bits: int = 7):
+        self._bits = sub_bucket_bits
+        self._linear_limit = 1 << sub_bucket_bits
+        self._half = 1 << (sub_bucket_bits - 1)
+        self._counts: Dict[int, int] = {}
+        self.count = 0
+        self.total_us = 0
+        self.min_us: Optional[int] = None
+        self.max_us: Optional[int] = None
+
+    def record(self, seconds: float):
+        value = max(0, int(seconds * 1_000_000))
+        index = self._index(value)
+        self._counts[index] = self._counts.get(index, 0) + 1
+        self.count += 1
+        self.total_us += value
+        if self.min_us is None or value < self.min_us:
+            self.min_us = value
+        if self.max_us is None or value > self.max_us:
+            self.max_us = value
+
+    def percentile(self, percentile: float) -> float:
+        """Return the latency in milliseconds at `percentile` (0-100)"""
+        if not self.count:
+            return 0.0
+        target = max(1, math.ceil(percentile / 100 * self.count))
+        seen = 0
+        for index in sorted(self._counts):
+            seen += self._counts[index]
+            if seen >= target:
+                return min(self._upper_value(index), self.max_us) / 1000
+        return self.max_us / 1000
+
+    def percentiles(
+        self, percentiles: Iterable[float] = DEFAULT_PERCENTILES
+    ) -> Dict[str, float]:
+        return {f"p{p:g}": self.percentile(p) for p in percentiles}
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "min_ms": (self.min_us or 0) / 1000,
+            "mean_ms": self.total_us / self.count / 1000 if self.count else 0.0,
+            "max_ms": (self.max_us or 0) / 1000,
+            **self.percentiles(),
+        }
+
+    def _index(self, value: int) -> int:
+        if value < self._linear_limit:
+            return value
+        shift = value.bit_length() - self._bits
+        return (shift + 1) * self._half + (value >> shift)
+
+    def _upper_value(self, index: int) -> int:
+        """Highest value that maps to `index`"""
+        if index < self._linear_limit:
+            return index
+        shift = index // self._half - 2
+        sub_bucket = index % self._half + self._half
+        return ((sub_bucket + 1) << shift) - 1
+
+
+class LatencyRecorder:
+    """Latency histograms keyed by (namespace, JSON-RPC method, kind).
+
+    kind is "reply" for emit_message until the matching on_message reply, and "ack" for
+    emit_message until the server acknowledges the socket.io emit. With an outbound scheduler
+    attached both include time spent queued, which the scheduler reports on its own.
+
+    Acks are only tracked when track_acks is set, because python-socketio keeps every pending
+    ack callback until it fires: only enable it against a server that acks message events.
+
+    Attach it to a namespace with `ns.latency = LatencyRecorder()`.
+    """
+
+    def __init__(self, *, track_acks: bool = False, sub_bucket_bits: int = 7):
+        self.track_acks = track_acks
+        self.sub_bucket_bits = sub_bucket_bits
+        self.histograms: Dict[Tuple[str, str, str], LatencyHistogram] = {}
+
+    def record(self, namespace: str, method: str, kind: str, seconds: float):
+        key = (namespace, method, kind)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = LatencyHistogram(self.sub_bucket_bits)
+        histogram.record(seconds)
+
+    def ack_callback(self, namespace: str, method: str):
+        """Return a socket.io emit callback that records the ack latency from now"""
+        started = time.monotonic()
+
+        def callback(*args):
+            self.record(namespace, method, "ack", time.monotonic() - started)
+
+        return callback
+
+    def get(
+        self, namespace: str, method: str, kind: str = "reply"
+    ) -> Optional[LatencyHistogram]:
+        return self.histograms.get((namespace, method, kind))
+
+    def percentiles(
+        self,
+        namespace: str,
+        method: str,
+        kind: str = "reply",
+        percentiles: Iterable[float] = DEFAULT_PERCENTILES,
+    ) -> Dict[str, float]:
+        histogram = self.get(namespace, method, kind)
+        if histogram is None:
+            return {}
+        return histogram.percentiles(percentiles)
+
+    def dump(self, path: Optional[str] = None) -> Dict[str, Dict[str, Dict]]:
+        """Return {namespace: {method: {kind: summary}}}, also written to `path` as JSON if given"""
+        report: Dict[str, Dict[str, Dict]] = {}
+        for (namespace, method, kind), histogram in sorted(self.histograms.items()):
+            report.setdefault(namespace, {}).setdefault(method, {})[
+                kind
+            ] = histogram.summary()
+        if path is not None:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=4)
+        return report
+
+    def format_report(self) -> str:
+        lines = [
+            f"{'namespace':<10}{'method':<28}{'kind':<6}{'count':>8}"
+            f"{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'p99.9 ms':>10}{'max ms':>10}"
+        ]
+        for (namespace, method, kind), histogram in sorted(self.histograms.items()):
+            s = histogram.summary()
+            lines.append(
+                f"{namespace:<10}{method:<28}{kind:<6}{s['count']:>8}"
+                f"{s['p50']:>10.3f}{s['p90']:>10.3f}{s['p99']:>10.3f}"
+                f"{s['p99.9']:>10.3f}{s['max_ms']:>10.3f}"
+            )
+        return "\n".join(lines)
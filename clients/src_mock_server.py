@@ -0,0 +1,479 @@
+"""Local stand-in for the Hourglass socket.io server, for running and load testing the clients offline.
+
+Usage: python src_mock_server.py [--port 3100] [--rfq-rate 0] [--fill-delay 1.0]
+
+Implements the /maker, /taker and /data namespaces:
+    /maker  hg_subscribeToMarket, hg_unsubscribeFromMarket, hg_submitQuote
+    /taker  hg_requestQuote, hg_acceptQuote
+    /data   hg_getMarkets
+and emits AccessToken on connect, RequestForQuoteBroadcast to makers subscribed to the RFQ's
+market, BestQuote to the RFQ's taker, QuoteAccepted to the winning maker (whose ack is the
+signed order), OrderCreated to the taker and OrderFulfilled to both after --fill-delay.
+
+--rfq-rate additionally broadcasts that many synthetic RFQs per second to subscribed makers,
+to measure maker throughput without a taker.
+"""
+
+import argparse
+import asyncio
+import itertools
+import secrets
+import socketio
+import time
+from aiohttp import web
+from typing import Any, Dict, List, Optional, Set, Tuple
+from src_config import (
+    CONDUIT_KEY,
+    maker_api_users,
+    taker_api_users,
+    weETH,
+    wstETH,
+)
+from src_logging import configure_logging, get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_MARKETS = [
+    {
+        "id": 1,
+        "baseAssetAddress": weETH,
+        "quoteAssetAddress": wstETH,
+        "chainId": 1,
+    }
+]
+DEFAULT_RFQ_TTL_MS = 5000
+# Seconds stop() gives connected clients to complete the websocket close handshake
+DEFAULT_CLOSE_TIMEOUT = 2.0
+# RFQs and quotes kept for lookups, the oldest are forgotten beyond this
+MAX_TRACKED = 100_000
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+ZERO_BYTES32 = "0x" + "00" * 32
+
+# JSON-RPC error codes
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+
+
+class RpcError(Exception):
+    def __init__(self, code: int, message: str):
+        self.code = code
+        self.message = message
+        super().__init__(message)
+
+
+class MockNamespace(socketio.AsyncNamespace):
+    """Authenticates connections and serves JSON-RPC methods named rpc_<method>"""
+
+    def __init__(self, server: "MockHourglassServer", namespace: str):
+        super().__init__(namespace)
+        self.mock = server
+        self.identities: Dict[str, str] = {}  # sid -> identity
+
+    def authenticate(self, auth: Dict[str, Any]) -> Optional[str]:
+        """Identity for the credentials in auth, None refuses the connection.
+        Namespaces that accept credentials override this, by default only tokens do."""
+        return None
+
+    async def on_connect(self, sid, environ, auth):
+        auth = auth or {}
+        identity = self.mock.tokens.get((self.namespace, auth.get("token")))
+        if identity is None:
+            identity = self.authenticate(auth)
+        if identity is None:
+            raise socketio.exceptions.ConnectionRefusedError("Invalid credentials")
+        self.identities[sid] = identity
+        token = secrets.token_hex(16)
+        self.mock.tokens[(self.namespace, token)] = identity
+        await self.emit("AccessToken", {"accessToken": token}, to=sid)
+
+    def on_disconnect(self, sid):
+        self.identities.pop(sid, None)
+
+    async def on_message(self, sid, data):
+        self.mock.stats["requests"] += len(data) if isinstance(data, list) else 1
+        if isinstance(data, list):
+            reply = [await self.handle_request(sid, msg) for msg in data]
+        else:
+            reply = await self.handle_request(sid, data)
+        await self.emit("message", reply, to=sid)
+        return "ACK"
+
+    async def handle_request(self, sid, msg: Dict[str, Any]) -> Dict[str, Any]:
+        reply = {"jsonrpc": "2.0", "id": msg.get("id")}
+        handler = getattr(self, f"rpc_{msg.get('method')}", None)
+        try:
+            if handler is None:
+                raise RpcError(
+                    METHOD_NOT_FOUND, f"Method not found: {msg.get('method')}"
+                )
+            reply["result"] = await handler(sid, msg.get("params") or {})
+        except RpcError as e:
+            reply["error"] = {"code": e.code, "message": e.message}
+        except (KeyError, TypeError, ValueError) as e:
+            reply["error"] = {"code": INVALID_PARAMS, "message": f"Invalid params: {e}"}
+        return reply
+
+
+class MockMakerNamespace(MockNamespace):
+    def authenticate(self, auth):
+        for user in maker_api_users:
+            if user["clientId"] == auth.get("clientId") and user[
+                "clientSecret"
+            ] == auth.get("clientSecret"):
+                return user["name"]
+        return None
+
+    def on_disconnect(self, sid):
+        super().on_disconnect(sid)
+        for subscribers in self.mock.subscriptions.values():
+            subscribers.discard(sid)
+
+    async def rpc_hg_subscribeToMarket(self, sid, params):
+        market_id = params["marketId"]
+        self.mock.get_market(market_id)
+        self.mock.subscriptions.setdefault(market_id, set()).add(sid)
+        return {"marketId": market_id}
+
+    async def rpc_hg_unsubscribeFromMarket(self, sid, params):
+        market_id = params["marketId"]
+        self.mock.subscriptions.get(market_id, set()).discard(sid)
+        return {"marketId": market_id}
+
+    async def rpc_hg_submitQuote(self, sid, params):
+        return await self.mock.submit_quote(sid, params)
+
+
+class MockTakerNamespace(MockNamespace):
+    def authenticate(self, auth):
+        for name, user in taker_api_users["protocol"].items():
+            protocol_user = user["protocolUser"]
+            if protocol_user["source"] == auth.get("source") and protocol_user[
+                "secret"
+            ] == auth.get("secret"):
+                return name
+        for user in taker_api_users["wallet"]:
+            wallet_user = user["walletUser"]
+            if wallet_user["clientId"] == auth.get("clientId") and wallet_user[
+                "clientSecret"
+            ] == auth.get("clientSecret"):
+                return user["name"]
+        return None
+
+    async def rpc_hg_requestQuote(self, sid, params):
+        return await self.mock.request_quote(sid, params)
+
+    async def rpc_hg_acceptQuote(self, sid, params):
+        return await self.mock.accept_quote(sid, params)
+
+
+class MockDataNamespace(MockNamespace):
+    async def on_connect(self, sid, environ, auth):
+        self.identities[sid] = "anonymous"
+
+    async def rpc_hg_getMarkets(self, sid, params):
+        return self.mock.markets
+
+
+class MockHourglassServer:
+    def __init__(
+        self,
+        *,
+        markets: Optional[List[Dict[str, Any]]] = None,
+        rfq_rate: float = 0.0,
+        rfq_ttl_ms: int = DEFAULT_RFQ_TTL_MS,
+        fill_delay: Optional[float] = 1.0,
+        **server_kwargs,
+    ):
+        self.markets = markets or DEFAULT_MARKETS
+        self.rfq_rate = rfq_rate
+        self.rfq_ttl_ms = rfq_ttl_ms
+        self.fill_delay = fill_delay
+
+        self.sio = socketio.AsyncServer(async_mode="aiohttp", **server_kwargs)
+        self.app = web.Application()
+        self.sio.attach(self.app)
+        self.maker_ns = MockMakerNamespace(self, "/maker")
+        self.taker_ns = MockTakerNamespace(self, "/taker")
+        self.data_ns = MockDataNamespace(self, "/data")
+        for ns in (self.maker_ns, self.taker_ns, self.data_ns):
+            self.sio.register_namespace(ns)
+
+        self.tokens: Dict[Tuple[str, str], str] = {}  # (namespace, token) -> identity
+        self.subscriptions: Dict[Any, Set[str]] = {}  # market id -> maker sids
+        self.rfqs: Dict[int, Dict[str, Any]] = {}
+        self.rfq_takers: Dict[int, Optional[str]] = {}  # rfq id -> taker sid
+        self.quotes: Dict[int, Dict[str, Any]] = {}
+        self.quote_makers: Dict[int, str] = {}  # quote id -> maker sid
+        self.best_quotes: Dict[int, Dict[str, Any]] = {}
+        self._rfq_ids = itertools.count(1)
+        self._quote_ids = itertools.count(1)
+        self._runner: Optional[web.AppRunner] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.stats = {
+            "requests": 0,
+            "rfqs": 0,
+            "broadcasts": 0,
+            "quotes": 0,
+            "accepted": 0,
+            "orders": 0,
+        }
+
+    # ------------------------------ Lifecycle ------------------------------
+
+    async def start(self, host: str = "localhost", port: int = 3100):
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        if self.rfq_rate > 0:
+            self._spawn(self._broadcast_synthetic_rfqs())
+        logger.info("Mock Hourglass server listening on ws://%s:%s", host, port)
+
+    async def stop(self, timeout: float = DEFAULT_CLOSE_TIMEOUT):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        # Disconnect the clients and let the websocket close handshakes complete before the
+        # app is cleaned up, which would otherwise wait on them for the close timeout
+        for socket in list(self.sio.eio.sockets.values()):
+            await socket.close(wait=False)
+        deadline = time.monotonic() + timeout
+        while self.sio.eio.sockets and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    # ------------------------------ Markets and RFQs ------------------------------
+
+    def get_market(self, market_id) -> Dict[str, Any]:
+        for market in self.markets:
+            if market["id"] == market_id:
+                return market
+        raise RpcError(INVALID_PARAMS, f"Unknown market {market_id}")
+
+    def find_market(self, base_asset_address: str, quote_asset_address: str):
+        for market in self.markets:
+            if (
+                market["baseAssetAddress"].lower() == base_asset_address.lower()
+                and market["quoteAssetAddress"].lower() == quote_asset_address.lower()
+            ):
+                return market
+        raise RpcError(INVALID_PARAMS, "No market for this asset pair")
+
+    async def request_quote(self, taker_sid: Optional[str], params: Dict[str, Any]):
+        market = self.find_market(
+            params["baseAssetAddress"], params["quoteAssetAddress"]
+        )
+        if ("baseAmount" in params) == ("quoteAmount" in params):
+            raise RpcError(INVALID_PARAMS, "Exactly one of baseAmount or quoteAmount")
+        rfq_id = next(self._rfq_ids)
+        rfq = {
+            "rfqId": rfq_id,
+            "quoteAssetReceiverAddress": params.get("quoteAssetReceiverAddress"),
+            "baseAssetChainId": params["baseAssetChainId"],
+            "quoteAssetChainId": params["quoteAssetChainId"],
+            "baseAssetAddress": params["baseAssetAddress"],
+            "quoteAssetAddress": params["quoteAssetAddress"],
+            "baseAmount": params.get("baseAmount"),
+            "quoteAmount": params.get("quoteAmount"),
+            "ttlMsecs": self.rfq_ttl_ms,
+            "executor": params.get("executor", "MAKER"),
+            "useCase": params.get("useCase", "DEFAULT"),
+        }
+        self.rfqs[rfq_id] = rfq
+        self.rfq_takers[rfq_id] = taker_sid
+        self.stats["rfqs"] += 1
+        while len(self.rfqs) > MAX_TRACKED:
+            old_id = next(iter(self.rfqs))
+            del self.rfqs[old_id]
+            self.rfq_takers.pop(old_id, None)
+            self.best_quotes.pop(old_id, None)
+        self._spawn(self._broadcast_rfq(market["id"], rfq))
+        return rfq
+
+    async def _broadcast_rfq(self, market_id, rfq: Dict[str, Any]):
+        for sid in list(self.subscriptions.get(market_id, ())):
+            self.stats["broadcasts"] += 1
+            await self.maker_ns.emit("RequestForQuoteBroadcast", rfq, to=sid)
+
+    async def _broadcast_synthetic_rfqs(self):
+        market = self.markets[0]
+        interval = 1 / self.rfq_rate
+        next_at = time.monotonic()
+        while True:
+            await self.request_quote(
+                None,
+                {
+                    "baseAssetAddress": market["baseAssetAddress"],
+                    "quoteAssetAddress": market["quoteAssetAddress"],
+                    "baseAssetChainId": market["chainId"],
+                    "quoteAssetChainId": market["chainId"],
+                    "quoteAmount": "100000000000000000000",
+                    "executor": "TAKER",
+                    "useCase": "ION_DELEVERAGE",
+                },
+            )
+            next_at += interval
+            await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+
+    # ------------------------------ Quotes and orders ------------------------------
+
+    async def submit_quote(self, maker_sid: str, params: Dict[str, Any]):
+        rfq_id = params["rfqId"]
+        rfq = self.rfqs.get(rfq_id)
+        if rfq is None:
+            raise RpcError(INVALID_PARAMS, f"Unknown RFQ {rfq_id}")
+        amount_key = "baseAmount" if rfq["quoteAmount"] is not None else "quoteAmount"
+        if amount_key not in params:
+            raise RpcError(INVALID_PARAMS, f"Quote for RFQ {rfq_id} needs {amount_key}")
+        quote_id = next(self._quote_ids)
+        quote = {"quoteId": quote_id, "rfqId": rfq_id, amount_key: params[amount_key]}
+        self.quotes[quote_id] = quote
+        self.quote_makers[quote_id] = maker_sid
+        self.stats["quotes"] += 1
+        while len(self.quotes) > MAX_TRACKED:
+            old_id = next(iter(self.quotes))
+            del self.quotes[old_id]
+            self.quote_makers.pop(old_id, None)
+
+        # The taker gives quoteAmount, so the best quote asks for the smallest baseAmount
+        best = self.best_quotes.get(rfq_id)
+        if best is None or self._is_better(quote, best, amount_key):
+            self.best_quotes[rfq_id] = quote
+            taker_sid = self.rfq_takers.get(rfq_id)
+            if taker_sid is not None:
+                await self.taker_ns.emit(
+                    "BestQuote", {"rfqId": rfq_id, "bestQuote": quote}, to=taker_sid
+                )
+        return quote
+
+    @staticmethod
+    def _is_better(quote, best, amount_key: str) -> bool:
+        if amount_key == "baseAmount":
+            return int(quote[amount_key]) < int(best[amount_key])
+        return int(quote[amount_key]) > int(best[amount_key])
+
+    async def accept_quote(self, taker_sid: str, params: Dict[str, Any]):
+        quote_id = params["quoteId"]
+        quote = self.quotes.get(quote_id)
+        if quote is None or quote["rfqId"] not in self.rfqs:
+            raise RpcError(INVALID_PARAMS, f"Unknown quote {quote_id}")
+        self.stats["accepted"] += 1
+        self._spawn(self._create_order(taker_sid, quote))
+        return {"quoteId": quote_id, "rfqId": quote["rfqId"]}
+
+    async def _create_order(self, taker_sid: str, quote: Dict[str, Any]):
+        rfq = self.rfqs[quote["rfqId"]]
+        components = self.build_order_components(rfq, quote)
+        maker_sid = self.quote_makers[quote["quoteId"]]
+        signed = await self.maker_ns.call(
+            "QuoteAccepted",
+            {
+                "rfqId": rfq["rfqId"],
+                "quoteId": quote["quoteId"],
+                "seaportOrderComponents": components,
+            },
+            to=maker_sid,
+        )
+        self.stats["orders"] += 1
+        await self.taker_ns.emit("OrderCreated", signed, to=taker_sid)
+        if self.fill_delay is not None:
+            await asyncio.sleep(self.fill_delay)
+            fulfilled = {"rfqId": rfq["rfqId"], "quoteId": quote["quoteId"]}
+            await self.maker_ns.emit("OrderFulfilled", fulfilled, to=maker_sid)
+            await self.taker_ns.emit("OrderFulfilled", fulfilled, to=taker_sid)
+
+    @staticmethod
+    def build_order_components(rfq: Dict[str, Any], quote: Dict[str, Any]):
+        """Seaport order in which the maker offers the quote asset for the base asset.
+
+        offerer and the maker's consideration recipient are left for the maker to fill in.
+        """
+        base_amount = quote.get("baseAmount") or rfq["baseAmount"]
+        quote_amount = rfq["quoteAmount"] or quote.get("quoteAmount")
+        receiver = rfq["quoteAssetReceiverAddress"] or ZERO_ADDRESS
+        now = int(time.time())
+        return {
+            "offerer": ZERO_ADDRESS,
+            "zone": ZERO_ADDRESS,
+            "offer": [
+                {
+                    "itemType": 1,
+                    "token": rfq["quoteAssetAddress"],
+                    "identifierOrCriteria": "0",
+                    "startAmount": quote_amount,
+                    "endAmount": quote_amount,
+                }
+            ],
+            "consideration": [
+                {
+                    "itemType": 1,
+                    "token": rfq["quoteAssetAddress"],
+                    "identifierOrCriteria": "0",
+                    "startAmount": "0",
+                    "endAmount": "0",
+                    "recipient": receiver,
+                },
+                {
+                    "itemType": 1,
+                    "token": rfq["baseAssetAddress"],
+                    "identifierOrCriteria": "0",
+                    "startAmount": base_amount,
+                    "endAmount": base_amount,
+                    "recipient": ZERO_ADDRESS,
+                },
+            ],
+            "orderType": 0,
+            "startTime": now,
+            "endTime": now + rfq["ttlMsecs"] // 1000 + 300,
+            "zoneHash": ZERO_BYTES32,
+            "salt": str(secrets.randbits(256)),
+            "conduitKey": CONDUIT_KEY,
+            "counter": "0",
+        }
+
+
+async def serve(args):
+    server = MockHourglassServer(
+        rfq_rate=args.rfq_rate,
+        rfq_ttl_ms=args.rfq_ttl_ms,
+        fill_delay=None if args.fill_delay < 0 else args.fill_delay,
+    )
+    await server.start(args.host, args.port)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        logger.info("Server stats: %s", server.stats)
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=3100)
+    parser.add_argument(
+        "--rfq-rate", type=float, default=0.0, help="synthetic RFQ broadcasts/sec"
+    )
+    parser.add_argument("--rfq-ttl-ms", type=int, default=DEFAULT_RFQ_TTL_MS)
+    parser.add_argument(
+        "--fill-delay",
+        type=float,
+        default=1.0,
+        help="seconds from OrderCreated to OrderFulfilled, negative to disable",
+    )
+    args = parser.parse_args()
+    configure_logging()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import asyncio
+from typing import Dict, Optional
+from eth_utils import to_checksum_address
+from web3 import AsyncWeb3
+from src_logging import get_logger
+
+logger = get_logger(__name__)
+
+# Node errors meaning the nonce was already used, by a mined or by a pending transaction.
+# "already known" is not one of them: the very same transaction is pending, see
+# is_already_known
+NONCE_ERRORS = (
+    "nonce too low",
+    "replacement transaction underpriced",
+    "nonce has already been used",
+)
+
+
+def is_nonce_error(error: Exception) -> bool:
+    message = str(error).lower()
+    return any(e in message for e in NONCE_ERRORS)
+
+
+def is_already_known(error: Exception) -> bool:
+    """True if the node already has the transaction that was sent, i.e. it was broadcast"""
+    return "already known" in str(error).lower()
+
+
+class NonceManager:
+    """Hands out transaction nonces per account without an RPC per transaction.
+
+    The first allocate() for an account seeds its next nonce from the node's pending
+    transaction count; later calls only increment it, so concurrent executors never share a
+    nonce. release() returns a nonce that was never broadcast. resync() reseeds from the
+    node, which is needed after a transaction was dropped or replaced (its nonce would
+    otherwise leave a gap that stalls every later transaction) or after a nonce error.
+
+    Usage:
+        nonces = NonceManager(w3)
+        tx["nonce"] = await nonces.allocate(address)
+    """
+
+    def __init__(self, w3: AsyncWeb3):
+        self.w3 = w3
+        self._next: Dict[str, int] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        # Count of syncs per account, so that resyncs queued behind one are skipped
+        self._generation: Dict[str, int] = {}
+        # stats
+        self.syncs = 0
+
+    async def allocate(self, address: str) -> int:
+        address = to_checksum_address(address)
+        # Always under the lock, so no nonce is handed out while a resync is in progress
+        # and then handed out again once it completes
+        async with self._lock(address):
+            if address not in self._next:
+                await self._sync(address)
+            nonce = self._next[address]
+            self._next[address] = nonce + 1
+        return nonce
+
+    def release(self, address: str, nonce: int):
+        """Give back a nonce whose transaction was not broadcast"""
+        address = to_checksum_address(address)
+        if self._next.get(address) == nonce + 1:
+            self._next[address] = nonce
+        else:
+            # Later nonces are already out, reseed on the next allocation instead of
+            # leaving a gap
+            self._next.pop(address, None)
+
+    async def resync(self, address: str, nonce: Optional[int] = None):
+        """Reseed from the node. Executors failing at once share a single resync, and given
+        the nonce that failed, one made after it was allocated is not repeated."""
+        address = to_checksum_address(address)
+        generation = self._generation.get(address)
+        async with self._lock(address):
+            if self._generation.get(address) != generation:
+                return
+            next_nonce = self._next.get(address)
+            if nonce is not None and next_nonce is not None and next_nonce <= nonce:
+                return
+            await self._sync(address)
+
+    def peek(self, address: str) -> Optional[int]:
+        """Next nonce of an account, None until it is seeded"""
+        return self._next.get(to_checksum_address(address))
+
+    def _lock(self, address: str) -> asyncio.Lock:
+        lock = self._locks.get(address)
+        if lock is None:
+            lock = self._locks[address] = asyncio.Lock()
+        return lock
+
+    async def _sync(self, address: str):
+        nonce = await self.w3.eth.get_transaction_count(address, "pending")
+        previous = self._next.get(address)
+        self._next[address] = nonce
+        self._generation[address] = self._generation.get(address, 0) + 1
+        self.syncs += 1
+        if previous is not None and previous != nonce:
+            logger.warning(
+                "Nonce of %s resynced from %d to %d", address, previous, nonce
+            )
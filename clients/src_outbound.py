@@ -0,0 +1,206 @@
+import asyncio
+import socketio
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Literal, Optional, Tuple
+from src_logging import get_logger
+
+logger = get_logger(__name__)
+
+# Default per-method limits as (messages per second, burst size)
+DEFAULT_LIMITS = {
+    "hg_submitQuote": (20.0, 10),
+    "hg_requestQuote": (10.0, 5),
+}
+# Default bound on the number of messages queued per method
+DEFAULT_MAX_QUEUE = 1000
+
+OverflowPolicy = Literal["reject", "drop_oldest"]
+
+
+class OutboundQueueFull(Exception):
+    """Raised by OutboundScheduler.submit when a queue is full and the policy is reject"""
+
+
+class OutboundDropped(Exception):
+    """Set on a queued message's future when it is dropped to make room for a newer one"""
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be positive and burst at least 1")
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def try_acquire(self) -> float:
+        """Take a token and return 0, or return the number of seconds until one is available"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    async def acquire(self):
+        while True:
+            delay = self.try_acquire()
+            if delay == 0:
+                return
+            await asyncio.sleep(delay)
+
+
+class _Lane:
+    """FIFO of messages for one rate-limited method (or for all unlimited methods)"""
+
+    def __init__(self, name: str, bucket: Optional[TokenBucket]):
+        self.name = name
+        self.bucket = bucket
+        self.queue: Deque[Tuple[Any, int, float, asyncio.Future]] = deque()
+        self.ready = asyncio.Event()
+        self.worker: Optional[asyncio.Task] = None
+        # stats
+        self.sent = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.max_depth = 0
+        self.total_queued_s = 0.0
+        self.max_queued_s = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "depth": len(self.queue),
+            "max_depth": self.max_depth,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "avg_queued_ms": (
+                self.total_queued_s / self.sent * 1000 if self.sent else 0.0
+            ),
+            "max_queued_ms": self.max_queued_s * 1000,
+        }
+
+
+class OutboundScheduler:
+    """Flow control between emit_message and sio.emit.
+
+    Messages are queued per JSON-RPC method. Methods listed in `limits` are released by their
+    own token bucket so a burst of quotes cannot starve or delay other methods, every other
+    method shares one unlimited lane. Each lane holds at most `max_queue` messages; when it is
+    full, `overflow` decides whether the new message is rejected (OutboundQueueFull) or the
+    oldest queued one is dropped (its future fails with OutboundDropped).
+
+    Attach it to a namespace with `ns.outbound = OutboundScheduler(sio, ...)`.
+    """
+
+    def __init__(
+        self,
+        sio: socketio.AsyncClient,
+        *,
+        limits: Optional[Dict[str, Tuple[float, int]]] = None,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        overflow: OverflowPolicy = "reject",
+    ):
+        if overflow not in ("reject", "drop_oldest"):
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.sio = sio
+        self.limits = DEFAULT_LIMITS if limits is None else limits
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self._lanes: Dict[Optional[str], _Lane] = {}
+
+    def submit(
+        self,
+        event: str,
+        data: Any,
+        *,
+        namespace: str,
+        method: str,
+        tokens: int = 1,
+        callback: Optional[Callable] = None,
+    ) -> asyncio.Future:
+        """Queue an emit without blocking. Returns a future resolved once it has been sent.
+
+        `tokens` is the number of calls in the message (a JSON-RPC batch costs one per call).
+        `callback` is passed to sio.emit to receive the server's ack.
+        """
+        lane = self._get_lane(method)
+        if len(lane.queue) >= self.max_queue:
+            if self.overflow == "reject":
+                lane.rejected += 1
+                raise OutboundQueueFull(
+                    f"Outbound queue for {lane.name} is full ({self.max_queue})"
+                )
+            *_, dropped = lane.queue.popleft()
+            lane.dropped += 1
+            if not dropped.done():
+                dropped.set_exception(
+                    OutboundDropped(f"Dropped from full outbound queue {lane.name}")
+                )
+        future = asyncio.get_running_loop().create_future()
+        lane.queue.append(
+            ((event, data, namespace, callback), tokens, time.monotonic(), future)
+        )
+        lane.max_depth = max(lane.max_depth, len(lane.queue))
+        lane.ready.set()
+        return future
+
+    def depth(self) -> int:
+        return sum(len(lane.queue) for lane in self._lanes.values())
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {lane.name: lane.stats() for lane in self._lanes.values()}
+
+    async def close(self):
+        """Stop the workers and fail every message still queued"""
+        for lane in self._lanes.values():
+            if lane.worker is not None:
+                lane.worker.cancel()
+            while lane.queue:
+                *_, future = lane.queue.popleft()
+                if not future.done():
+                    future.set_exception(OutboundDropped("Outbound scheduler closed"))
+        await asyncio.gather(
+            *(lane.worker for lane in self._lanes.values() if lane.worker),
+            return_exceptions=True,
+        )
+        self._lanes.clear()
+
+    def _get_lane(self, method: str) -> _Lane:
+        key = method if method in self.limits else None
+        lane = self._lanes.get(key)
+        if lane is None:
+            bucket = TokenBucket(*self.limits[key]) if key is not None else None
+            lane = _Lane(key or "unlimited", bucket)
+            lane.worker = asyncio.create_task(self._run_lane(lane))
+            self._lanes[key] = lane
+        return lane
+
+    async def _run_lane(self, lane: _Lane):
+        while True:
+            if not lane.queue:
+                lane.ready.clear()
+                await lane.ready.wait()
+                continue
+            (event, data, namespace, callback), tokens, enqueued_at, future = (
+                lane.queue.popleft()
+            )
+            if lane.bucket is not None:
+                for _ in range(tokens):
+                    await lane.bucket.acquire()
+            queued_s = time.monotonic() - enqueued_at
+            lane.total_queued_s += queued_s
+            lane.max_queued_s = max(lane.max_queued_s, queued_s)
+            try:
+                await self.sio.emit(event, data, namespace=namespace, callback=callback)
+            except Exception as e:
+                logger.warning("Failed to emit queued %s message: %s", lane.name, e)
+                if not future.done():
+                    future.set_exception(e)
+                continue
+            lane.sent += 1
+            if not future.done():
+                future.set_result(None)
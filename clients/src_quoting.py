@@ -0,0 +1,138 @@
+import asyncio
+import inspect
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Union
+from src_logging import get_logger
+from src_maker import get_quote_params
+from src_metrics import LatencyHistogram
+from src_rpc import DEFAULT_REQUEST_TIMEOUT, wait_for_response
+from src_scheduler import DeadlineExpired, DeadlineScheduler, rfq_deadline
+from src_shared import emit_message
+
+logger = get_logger(__name__)
+
+# A pricer receives the RFQ broadcast and returns submit_quote amounts, e.g.
+# {"base_amount": "112000000000"}, or None to skip the RFQ. It may be a coroutine function.
+Pricer = Callable[
+    [Dict[str, Any]],
+    Union[Optional[Dict[str, str]], Awaitable[Optional[Dict[str, str]]]],
+]
+
+DEFAULT_MAX_CONCURRENCY = 32
+# RFQs in progress beyond this are dropped rather than quoted late
+DEFAULT_MAX_PENDING = 1000
+
+
+class QuotingEngine:
+    """Prices every RFQ broadcast and submits the quote without manual submit_quote calls.
+
+    Pricing and emitting run on a DeadlineScheduler, the namespace's `scheduler` if it has
+    one or a private one with `max_concurrency` workers, so RFQs closest to their ttlMsecs
+    are quoted first and expired ones are skipped. At most `max_pending` RFQs are in progress
+    (queued, being priced or awaiting the server's reply), further broadcasts are dropped.
+    Receipt-to-emit latency (from the broadcast reaching on_RequestForQuoteBroadcast until
+    hg_submitQuote is handed to socket.io) is recorded in `receipt_to_emit`, as it decides
+    whether a quote arrives in time to win.
+
+    Usage: ns.quoting_engine = QuotingEngine(ns, pricer)
+    """
+
+    def __init__(
+        self,
+        ns,
+        pricer: Pricer,
+        *,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        timeout: Optional[float] = DEFAULT_REQUEST_TIMEOUT,
+        scheduler: Optional[DeadlineScheduler] = None,
+    ):
+        scheduler = scheduler or getattr(ns, "scheduler", None)
+        self._owns_scheduler = scheduler is None
+        self.scheduler = scheduler or DeadlineScheduler(max_concurrency=max_concurrency)
+        self.ns = ns
+        self.pricer = pricer
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.receipt_to_emit = LatencyHistogram()
+        self._tasks: Set[asyncio.Task] = set()
+        # stats
+        self.received = 0
+        self.quoted = 0
+        self.skipped = 0
+        self.dropped = 0
+        self.expired = 0
+        self.errors = 0
+
+    def submit(self, rfq: Dict[str, Any], received_at: Optional[float] = None):
+        """Schedule quoting of an RFQ broadcast, called from on_RequestForQuoteBroadcast"""
+        received_at = time.monotonic() if received_at is None else received_at
+        self.received += 1
+        if len(self._tasks) >= self.max_pending:
+            self.dropped += 1
+            logger.warning(
+                "Dropping RFQ %s, %d pending", rfq.get("rfqId"), len(self._tasks)
+            )
+            return
+        task = asyncio.create_task(self._quote(rfq, received_at))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "received": self.received,
+            "quoted": self.quoted,
+            "skipped": self.skipped,
+            "dropped": self.dropped,
+            "expired": self.expired,
+            "errors": self.errors,
+            "pending": len(self._tasks),
+            "receipt_to_emit_ms": self.receipt_to_emit.summary(),
+        }
+
+    async def close(self):
+        """Cancel every RFQ still being priced or waiting for its reply"""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._owns_scheduler:
+            await self.scheduler.close()
+
+    async def _quote(self, rfq: Dict[str, Any], received_at: float):
+        rfq_id = rfq["rfqId"]
+        deadline = rfq_deadline(rfq, received_at)
+        try:
+            future = await self.scheduler.run(
+                deadline, self._price_and_emit, rfq, received_at, kind="quote"
+            )
+        except DeadlineExpired:
+            self.expired += 1
+            logger.debug("RFQ %s expired before it could be quoted", rfq_id)
+            return
+        except Exception:
+            self.errors += 1
+            logger.exception("Failed to quote RFQ %s", rfq_id)
+            return
+        if future is None:
+            self.skipped += 1
+            return
+        # Waiting for the reply does not hold a scheduler slot, the quote is already out
+        try:
+            await wait_for_response(future, self.timeout)
+            self.quoted += 1
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Quote for RFQ %s failed: %s", rfq_id, e)
+
+    async def _price_and_emit(
+        self, rfq: Dict[str, Any], received_at: float
+    ) -> Optional[asyncio.Future]:
+        amounts = self.pricer(rfq)
+        if inspect.isawaitable(amounts):
+            amounts = await amounts
+        if amounts is None:
+            return None
+        params = get_quote_params(rfq_id=rfq["rfqId"], **amounts)
+        future = await emit_message(self.ns, self.ns.client, "hg_submitQuote", params)
+        self.receipt_to_emit.record(time.monotonic() - received_at)
+        return future
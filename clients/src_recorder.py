@@ -0,0 +1,144 @@
+import asyncio
+import gzip
+import json
+import queue
+import threading
+import time
+from typing import Any, Dict, IO, Iterator, List, Optional
+from src_logging import get_logger
+from src_rpc import register_request
+
+logger = get_logger(__name__)
+
+_STOP = object()
+
+
+def _open(path: str, mode: str) -> IO[bytes]:
+    return gzip.open(path, mode) if path.endswith(".gz") else open(path, mode)
+
+
+class TrafficRecorder:
+    """Append every inbound event and outbound JSON-RPC payload of a namespace to a file.
+
+    The file holds one compact JSON record per line (gzip-compressed if the path ends in .gz):
+        {"t": <unix time>, "d": "in" | "out", "ns": <namespace>, "e": <event>, "a": [<args>]}
+    Records are serialized on the calling thread, so later mutation of a payload by a handler
+    cannot change what was captured, and written by a background thread through a buffered file,
+    so the event loop never waits on disk I/O.
+
+    Usage: recorder = TrafficRecorder("maker.jsonl.gz"); recorder.attach(ns); ...; recorder.close()
+    """
+
+    def __init__(self, path: str, *, buffer_size: int = 1 << 16):
+        self.path = path
+        self.records = 0
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        if path.endswith(".gz"):
+            self._file = gzip.open(path, "ab")
+        else:
+            self._file = open(path, "ab", buffering=buffer_size)
+        self._thread = threading.Thread(
+            target=self._write_loop, name="traffic-recorder", daemon=True
+        )
+        self._thread.start()
+
+    def attach(self, ns):
+        """Record ns's inbound events (by wrapping trigger_event) and its outbound payloads"""
+        trigger_event = ns.trigger_event
+        recorder = self
+
+        async def recording_trigger_event(event, *args):
+            recorder.record("in", ns.namespace, event, args)
+            return await trigger_event(event, *args)
+
+        ns.trigger_event = recording_trigger_event
+        ns.recorder = self
+
+    def record(self, direction: str, namespace: str, event: str, args):
+        line = json.dumps(
+            {"t": time.time(), "d": direction, "ns": namespace, "e": event, "a": args},
+            separators=(",", ":"),
+            default=str,
+        )
+        self.records += 1
+        self._queue.put(line.encode() + b"\n")
+
+    def record_outbound(self, namespace: str, payload: Any):
+        self.record("out", namespace, "message", [payload])
+
+    def close(self):
+        """Write out everything recorded so far and close the file"""
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._file.close()
+
+    def _write_loop(self):
+        while True:
+            line = self._queue.get()
+            if line is _STOP:
+                break
+            self._file.write(line)
+            # Flush only when the queue is drained to batch writes under load
+            if self._queue.empty():
+                self._file.flush()
+        self._file.flush()
+
+
+def read_records(path: str) -> Iterator[Dict[str, Any]]:
+    with _open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class TrafficReplayer:
+    """Feed recorded traffic back into namespaces, deterministically and in recorded order.
+
+    Inbound events are dispatched with ns.trigger_event exactly as the socket.io client would.
+    Outbound requests are not sent again, they are only registered in ns.sent_messages so that
+    recorded replies route to the same handlers. Handlers that emit need ns to be connected.
+
+    speed=1.0 replays with the recorded timing, speed=N runs N times faster and speed=None
+    replays as fast as the handlers allow, which is what handler throughput benchmarks want.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.records: List[Dict[str, Any]] = list(read_records(path))
+
+    async def replay(self, namespaces: Dict[str, Any], *, speed: Optional[float] = 1.0):
+        """namespaces maps a recorded namespace (e.g. "/maker") to the namespace object to feed.
+
+        Returns counts of replayed events and handler errors, elapsed time and events/sec.
+        """
+        if speed is not None and speed <= 0:
+            raise ValueError("speed must be positive or None")
+        events = errors = 0
+        first_t = self.records[0]["t"] if self.records else 0.0
+        started = time.monotonic()
+        for record in self.records:
+            ns = namespaces.get(record["ns"])
+            if ns is None:
+                continue
+            if speed is not None:
+                delay = started + (record["t"] - first_t) / speed - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            if record["d"] == "out":
+                payload = record["a"][0]
+                for msg in payload if isinstance(payload, list) else [payload]:
+                    register_request(ns, msg)
+                continue
+            events += 1
+            try:
+                await ns.trigger_event(record["e"], *record["a"])
+            except Exception:
+                errors += 1
+                logger.exception("Handler failed replaying %s", record["e"])
+        elapsed = time.monotonic() - started
+        return {
+            "events": events,
+            "errors": errors,
+            "elapsed_s": elapsed,
+            "events_per_s": events / elapsed if elapsed else 0.0,
+        }
@@ -0,0 +1,343 @@
+import asyncio
+import functools
+import inspect
+import itertools
+import socketio
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Literal, Optional
+from uuid_extensions import uuid7str
+from src_logging import LazyJson, get_logger
+
+# Default number of seconds to wait for the server to reply to a JSON-RPC request
+DEFAULT_REQUEST_TIMEOUT = 30.0
+# Requests without a reply after this many seconds are evicted from the in-flight table
+DEFAULT_IN_FLIGHT_TTL = 60.0
+# Upper bound on the number of requests tracked at once per namespace
+DEFAULT_MAX_IN_FLIGHT = 10_000
+# Namespace methods named handle_successful_<method> are registered as handlers for <method>
+HANDLER_PREFIX = "handle_successful_"
+
+MessageIds = Literal["uuid7", "counter"]
+
+logger = get_logger(__name__)
+
+
+class JsonRpcError(Exception):
+    """Raised into the caller's future when the server replies with a JSON-RPC error"""
+
+    def __init__(self, msg_id: str, method: str, error: Any):
+        self.msg_id = msg_id
+        self.method = method
+        self.error = error
+        self.code = error.get("code") if isinstance(error, dict) else None
+        super().__init__(f"Request {msg_id} ({method}) received error: {error}")
+
+
+class InFlightRequest:
+    __slots__ = ("msg", "future", "sent_at", "expires_at")
+
+    def __init__(
+        self,
+        msg: Dict[str, Any],
+        future: asyncio.Future,
+        sent_at: float,
+        expires_at: float,
+    ):
+        self.msg = msg
+        self.future = future
+        self.sent_at = sent_at
+        self.expires_at = expires_at
+
+
+class InFlightRequests:
+    """Bounded table of sent JSON-RPC requests awaiting a reply.
+
+    Entries are removed when their reply arrives, when their future is cancelled (e.g. by a
+    caller that timed out), when they are older than `ttl` seconds or, if the table holds
+    `max_size` entries, when a newer request needs the slot. Every entry shares the same
+    ttl, so insertion order is also expiry order and eviction only ever looks at the oldest
+    entries: insert, lookup and removal are all O(1).
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl: float = DEFAULT_IN_FLIGHT_TTL,
+        max_size: int = DEFAULT_MAX_IN_FLIGHT,
+    ):
+        if ttl <= 0:
+            raise ValueError("ttl must be positive")
+        if max_size <= 0:
+            raise ValueError("max_size must be positive")
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[Any, InFlightRequest]" = OrderedDict()
+        # counters
+        self.completed = 0
+        self.expired = 0
+        self.evicted = 0
+        self.cancelled = 0
+        self.orphaned_replies = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, msg_id):
+        return msg_id in self._entries
+
+    def __getitem__(self, msg_id) -> Dict[str, Any]:
+        return self._entries[msg_id].msg
+
+    def add(self, msg_id, msg: Dict[str, Any], future: asyncio.Future):
+        now = time.monotonic()
+        self.expire(now)
+        while len(self._entries) >= self.max_size:
+            _, entry = self._entries.popitem(last=False)
+            self.evicted += 1
+            self._fail(entry, "evicted from the in-flight table (max_size reached)")
+        self._entries[msg_id] = InFlightRequest(msg, future, now, now + self.ttl)
+        future.add_done_callback(functools.partial(self._on_done, msg_id))
+
+    def pop(self, msg_id) -> Optional[InFlightRequest]:
+        """Remove and return the entry for a reply, or None (counted as orphaned) if unknown"""
+        entry = self._entries.pop(msg_id, None)
+        if entry is None:
+            self.orphaned_replies += 1
+        else:
+            self.completed += 1
+        self.expire()
+        return entry
+
+    def discard(self, msg_id):
+        self._entries.pop(msg_id, None)
+
+    def expire(self, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        entries = self._entries
+        while entries:
+            entry = next(iter(entries.values()))
+            if entry.expires_at > now:
+                break
+            entries.popitem(last=False)
+            self.expired += 1
+            self._fail(entry, f"received no reply within {self.ttl}s")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._entries),
+            "completed": self.completed,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "cancelled": self.cancelled,
+            "orphaned_replies": self.orphaned_replies,
+        }
+
+    def _on_done(self, msg_id, future: asyncio.Future):
+        # A cancelled request is abandoned, its late reply must not run the handler
+        if not future.cancelled():
+            return
+        entry = self._entries.get(msg_id)
+        if entry is not None and entry.future is future:
+            del self._entries[msg_id]
+            self.cancelled += 1
+
+    @staticmethod
+    def _fail(entry: InFlightRequest, reason: str):
+        if not entry.future.done():
+            entry.future.set_exception(
+                asyncio.TimeoutError(f"Request {entry.msg['id']} {reason}")
+            )
+
+
+def register_request(ns, msg: Dict[str, Any]) -> asyncio.Future:
+    """Track msg as in flight and return the future that will receive its reply"""
+    if not isinstance(getattr(ns, "sent_messages", None), InFlightRequests):
+        raise ValueError(
+            "Namespace must have a sent_messages attribute that is an InFlightRequests"
+        )
+    future = asyncio.get_running_loop().create_future()
+    # Fire-and-forget callers never await the future, so mark its exception as retrieved
+    # to keep asyncio from logging "exception was never retrieved" for every failed request
+    future.add_done_callback(_silence_unretrieved_exception)
+    ns.sent_messages.add(msg["id"], msg, future)
+    return future
+
+
+def _silence_unretrieved_exception(future: asyncio.Future):
+    if not future.cancelled():
+        future.exception()
+
+
+def resolve_response(
+    entry: InFlightRequest,
+    result: Optional[Any] = None,
+    error: Optional[Any] = None,
+):
+    """Resolve the caller's future for a popped in-flight entry with the JSON-RPC result or error"""
+    future = entry.future
+    # The caller may have timed out or cancelled the request already
+    if future.done():
+        return
+    if error:
+        future.set_exception(JsonRpcError(entry.msg["id"], entry.msg["method"], error))
+    else:
+        future.set_result(result)
+
+
+async def wait_for_response(
+    future: asyncio.Future, timeout: Optional[float] = DEFAULT_REQUEST_TIMEOUT
+):
+    """Await the reply to a request. Raises asyncio.TimeoutError (and cancels the future) on timeout"""
+    return await asyncio.wait_for(future, timeout)
+
+
+# ------------------------------ MESSAGE IDS ------------------------------
+
+
+def counter_ids(start: int = 1) -> Callable[[], int]:
+    """Return a generator of compact, monotonic integer ids (valid JSON-RPC 2.0 ids).
+
+    Each namespace gets its own counter, so ids are unique per connection. The counter is not
+    reset on reconnect, so a late reply from a previous connection can never match a new request.
+    """
+    return itertools.count(start).__next__
+
+
+def get_id_generator(message_ids: MessageIds = "uuid7") -> Callable[[], Any]:
+    if message_ids == "uuid7":
+        return uuid7str
+    if message_ids == "counter":
+        return counter_ids()
+    raise ValueError(f"Unknown message id generator: {message_ids}")
+
+
+# ------------------------------ DISPATCH ------------------------------
+
+
+def rpc_handler(method: str) -> Callable:
+    """Register the decorated namespace method as the handler for successful `method` replies.
+
+    Only needed when the handler is not named handle_successful_<method>.
+    """
+
+    def decorator(fn):
+        fn._rpc_method = method
+        return fn
+
+    return decorator
+
+
+class JsonRpcNamespace(socketio.AsyncClientNamespace):
+    """Namespace that tracks sent JSON-RPC requests and routes their replies.
+
+    Replies are dispatched through a per-class table mapping the JSON-RPC method to the name
+    of its handler. The table is built once per subclass from the parent's table plus any
+    handle_successful_<method> or @rpc_handler methods the subclass defines, so subclasses add
+    or override methods without touching on_message. Handlers run synchronously inside
+    on_message and so must not be coroutine functions; one that needs to await should start
+    a task.
+    """
+
+    _rpc_handlers: Dict[str, str] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        handlers = dict(cls._rpc_handlers)
+        for name, attr in vars(cls).items():
+            method = getattr(attr, "_rpc_method", None)
+            if method is None and name.startswith(HANDLER_PREFIX):
+                method = name[len(HANDLER_PREFIX) :]
+            if method is not None:
+                if inspect.iscoroutinefunction(attr):
+                    raise TypeError(
+                        f"{cls.__name__}.{name} must not be async, reply handlers are "
+                        "called synchronously"
+                    )
+                handlers[method] = name
+        cls._rpc_handlers = handlers
+
+    def __init__(
+        self,
+        *args,
+        in_flight_ttl: float = DEFAULT_IN_FLIGHT_TTL,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        message_ids: MessageIds = "uuid7",
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.sent_messages = InFlightRequests(ttl=in_flight_ttl, max_size=max_in_flight)
+        self.next_message_id = get_id_generator(message_ids)
+        # Optional src_outbound.OutboundScheduler used by emit_message for flow control
+        self.outbound = None
+        # Optional src_metrics.LatencyRecorder for request round-trip latencies
+        self.latency = None
+        # Optional src_recorder.TrafficRecorder, set by TrafficRecorder.attach
+        self.recorder = None
+        # Called with the namespace when it disconnects, e.g. by a ConnectionSupervisor
+        self.disconnect_listeners: List[Callable[[str], None]] = []
+
+    async def trigger_event(self, event, *args):
+        if event == "disconnect":
+            for listener in list(self.disconnect_listeners):
+                listener(self.namespace)
+        return await super().trigger_event(event, *args)
+
+    def on_message(self, data):
+        logger.debug("EVENT [message]: Received message: %s", LazyJson(data))
+        # JSON-RPC batch replies arrive as an array of individual replies
+        if isinstance(data, list):
+            for reply in data:
+                try:
+                    self.handle_reply(reply)
+                except Exception:
+                    logger.exception("Failed to handle reply in batch: %s", reply)
+            return
+        self.handle_reply(data)
+
+    def handle_reply(self, data):
+        msg_id = data["id"]
+        result = data["result"] if "result" in data else None
+        error = data["error"] if "error" in data else None
+        jsonrpc = data["jsonrpc"]
+        if not jsonrpc == "2.0":
+            raise Exception("Invalid JSON-RPC version received from server")
+        # handle response based on sent messages
+        entry = self.sent_messages.pop(msg_id)
+        if entry is None:
+            logger.warning(
+                "Received reply to unknown or expired request %s, ignoring", msg_id
+            )
+            return
+        if self.latency is not None:
+            self.latency.record(
+                self.namespace,
+                entry.msg["method"],
+                "reply",
+                time.monotonic() - entry.sent_at,
+            )
+        # handle errors
+        if error:
+            logger.warning("For request %s received error: %s", msg_id, error)
+            resolve_response(entry, error=error)
+            return
+        # handle results
+        try:
+            self.dispatch_result(entry.msg["method"], result)
+        except Exception as e:
+            if not entry.future.done():
+                entry.future.set_exception(e)
+            raise
+        resolve_response(entry, result=result)
+
+    def dispatch_result(self, method: str, result: Any):
+        handler_name = self._rpc_handlers.get(method)
+        if handler_name is None:
+            logger.warning(
+                "No handler registered for method %s, result: %s", method, result
+            )
+            return
+        handled = getattr(self, handler_name)(result)
+        if inspect.iscoroutine(handled):
+            handled.close()
+            raise TypeError(f"Reply handler {handler_name} must not be async")
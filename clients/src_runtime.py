@@ -0,0 +1,153 @@
+import asyncio
+import socketio
+import threading
+from typing import Any, Dict, List, Literal, Optional, Tuple
+from src_codec import create_client
+from src_logging import get_logger
+from src_rpc import JsonRpcNamespace
+from src_supervisor import ConnectionSupervisor
+
+try:
+    import uvloop
+except ImportError:  # optional dependency
+    uvloop = None
+
+logger = get_logger(__name__)
+
+LoopKind = Literal["auto", "asyncio", "uvloop"]
+
+
+def get_server_url(env: str) -> str:
+    """URL of the socket.io server shared by the /maker, /taker and /data namespaces"""
+    if env == "local":
+        return "ws://localhost:3100"
+    if env == "staging":
+        return "wss://api-origin-staging-v2.hourglass.com"
+    raise ValueError(f"Unknown environment: {env}")
+
+
+def new_event_loop(kind: LoopKind = "auto") -> asyncio.AbstractEventLoop:
+    """Create an event loop, on uvloop if kind is "uvloop", or "auto" and uvloop is installed"""
+    if kind == "uvloop" or (kind == "auto" and uvloop is not None):
+        if uvloop is None:
+            raise ImportError("uvloop is not installed, run `pip install uvloop`")
+        return uvloop.new_event_loop()
+    if kind not in ("auto", "asyncio"):
+        raise ValueError(f"Unknown event loop: {kind}")
+    return asyncio.new_event_loop()
+
+
+def start_loop_thread(
+    kind: LoopKind = "auto", *, name: str = "hourglass-loop"
+) -> Tuple[asyncio.AbstractEventLoop, threading.Thread]:
+    """Run a new event loop forever in a daemon thread, as the notebooks do.
+
+    Schedule work on it with asyncio.run_coroutine_threadsafe(coro, loop) and stop it with
+    stop_loop_thread(loop, thread).
+    """
+    loop = new_event_loop(kind)
+    thread = threading.Thread(target=loop.run_forever, name=name, daemon=True)
+    thread.start()
+    logger.debug("Started %s event loop in thread %s", type(loop).__module__, name)
+    return loop, thread
+
+
+def stop_loop_thread(
+    loop: asyncio.AbstractEventLoop,
+    thread: threading.Thread,
+    timeout: Optional[float] = 5.0,
+):
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout)
+    if not thread.is_alive():
+        loop.close()
+
+
+def merge_auth(*auths: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine the auth dicts of several roles, raising ValueError if two disagree on a key"""
+    merged: Dict[str, Any] = {}
+    for auth in auths:
+        for key, value in (auth or {}).items():
+            if key in merged and merged[key] != value:
+                raise ValueError(f"Conflicting values for auth key {key!r}")
+            merged[key] = value
+    return merged
+
+
+class ClientRuntime:
+    """One socket.io client, and so one engine.io connection, shared by several namespaces.
+
+    socket.io multiplexes namespaces over a single websocket, so a process that makes, takes
+    and reads market data needs one handshake, one socket and one event loop instead of three.
+    The client sends the same auth with every namespace's CONNECT packet, so the roles'
+    credentials are merged and each namespace's authenticator reads the keys it knows.
+    A merged auth never carries an access token, since a token identifies a single role.
+    Under supervise(), the server disconnecting any one namespace reconnects the client, as
+    the transport staying up for the other namespaces would otherwise hide the drop.
+
+    Usage:
+        runtime = ClientRuntime(get_server_url("staging"))
+        maker = runtime.add(MakerNamespaceBase("/maker", set_access_token=...), maker_auth)
+        taker = runtime.add(TakerNamespaceBase("/taker", set_access_token=...), taker_auth)
+        data = runtime.add(DataNamespace("/data"))
+        await runtime.connect()
+    """
+
+    def __init__(self, server_url: str, *, codec: str = "json", **client_kwargs):
+        self.server_url = server_url
+        self.sio: socketio.AsyncClient = create_client(codec, **client_kwargs)
+        self.auths: Dict[str, Dict[str, Any]] = {}
+        self.supervisor: Optional[ConnectionSupervisor] = None
+
+    @property
+    def namespaces(self) -> List[str]:
+        return list(self.sio.namespace_handlers)
+
+    @property
+    def auth(self) -> Dict[str, Any]:
+        return self._merge(self.auths)
+
+    def add(
+        self, ns: JsonRpcNamespace, auth: Optional[Dict[str, Any]] = None
+    ) -> JsonRpcNamespace:
+        """Register ns on the shared client, with the auth its role connects with"""
+        if self.sio.connected:
+            raise RuntimeError("Namespaces must be added before connecting")
+        if ns.namespace in self.sio.namespace_handlers:
+            raise ValueError(f"Namespace {ns.namespace} is already registered")
+        auths = {**self.auths, ns.namespace: dict(auth or {})}
+        self._merge(auths)
+        self.auths = auths
+        self.sio.register_namespace(ns)
+        return ns
+
+    async def connect(self, *, transports: Optional[List[str]] = None):
+        """Connect every added namespace over one websocket"""
+        await self.sio.connect(
+            self.server_url,
+            namespaces=self.namespaces,
+            transports=transports or ["websocket"],
+            auth=self.auth,
+        )
+
+    def supervise(self, **kwargs) -> ConnectionSupervisor:
+        """Create a ConnectionSupervisor for the shared client, to use instead of connect()"""
+        self.supervisor = ConnectionSupervisor(
+            self.sio, self.server_url, auth=self.auth, **kwargs
+        )
+        return self.supervisor
+
+    @staticmethod
+    def _merge(auths: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        if len(auths) > 1:
+            auths = {
+                namespace: {k: v for k, v in auth.items() if k != "token"}
+                for namespace, auth in auths.items()
+            }
+        return merge_auth(*auths.values())
+
+    async def disconnect(self):
+        if self.supervisor is not None:
+            await self.supervisor.stop()
+        elif self.sio.connected:
+            await self.sio.disconnect()
@@ -0,0 +1,219 @@
+import asyncio
+import heapq
+import inspect
+import itertools
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from src_logging import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = 32
+DEFAULT_MAX_QUEUE = 10_000
+# Work must finish this long before the RFQ expires for the result to reach the server in time
+DEFAULT_DEADLINE_MARGIN = 0.05
+# RFQ deadlines remembered by DeadlineTable
+DEFAULT_MAX_DEADLINES = 100_000
+# Weight of the latest run in each kind's moving average run time
+RUN_TIME_SMOOTHING = 0.2
+
+
+class DeadlineExpired(Exception):
+    """Set on a scheduled job's future when its deadline passed before it could finish"""
+
+
+class SchedulerQueueFull(Exception):
+    """Raised by DeadlineScheduler.submit when max_queue jobs are already waiting"""
+
+
+def rfq_deadline(
+    rfq: Dict[str, Any],
+    received_at: Optional[float] = None,
+    margin: float = DEFAULT_DEADLINE_MARGIN,
+) -> float:
+    """time.monotonic() deadline of an RFQ from its ttlMsecs, counted from when it was received.
+
+    RFQs without a ttlMsecs never expire.
+    """
+    ttl_msecs = rfq.get("ttlMsecs")
+    if ttl_msecs is None:
+        return math.inf
+    received_at = time.monotonic() if received_at is None else received_at
+    return received_at + ttl_msecs / 1000 - margin
+
+
+class DeadlineTable:
+    """Deadlines of recently seen RFQs by rfqId, for work that only carries the id later on
+    (e.g. QuoteAccepted). Expired entries at the head and entries beyond max_size are evicted.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_MAX_DEADLINES):
+        self.max_size = max_size
+        self._deadlines: "OrderedDict[Any, float]" = OrderedDict()
+
+    def add(self, key, deadline: float):
+        self._deadlines[key] = deadline
+        self._deadlines.move_to_end(key)
+        now = time.monotonic()
+        while self._deadlines and (
+            len(self._deadlines) > self.max_size
+            or next(iter(self._deadlines.values())) <= now
+        ):
+            self._deadlines.popitem(last=False)
+
+    def get(self, key) -> float:
+        """Deadline for key, or infinity if it is unknown"""
+        return self._deadlines.get(key, math.inf)
+
+    def __len__(self):
+        return len(self._deadlines)
+
+
+class DeadlineScheduler:
+    """Runs RFQ-driven work earliest-deadline-first and sheds work that can no longer matter.
+
+    Jobs are submitted with a time.monotonic() deadline and run by `max_concurrency` workers
+    in deadline order. A job is shed without running when its deadline has passed or is closer
+    than the average run time of its kind, and a job running past its deadline is cancelled;
+    either way its future fails with DeadlineExpired. Exceptions raised by the job itself,
+    including its own asyncio.TimeoutError, are set on its future as they are, and a job
+    cancelled from within cancels its future.
+    Under overload the process therefore spends its time on the RFQs it can still win.
+    Counters are kept per job kind (e.g. "quote", "accept", "sign").
+
+    Usage: result = await scheduler.run(rfq_deadline(rfq), coroutine_fn, *args, kind="quote")
+    """
+
+    def __init__(
+        self,
+        *,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+    ):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._heap: List[Tuple[float, int, str, Callable, tuple, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._ready: Optional[asyncio.Event] = None
+        self._workers: List[asyncio.Task] = []
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._run_times: Dict[str, float] = {}
+
+    def submit(
+        self, deadline: float, fn: Callable, *args, kind: str = "rfq"
+    ) -> asyncio.Future:
+        """Queue fn(*args) (a coroutine function or a plain callable) to run by deadline"""
+        stats = self._kind_stats(kind)
+        if len(self._heap) >= self.max_queue:
+            stats["rejected"] += 1
+            raise SchedulerQueueFull(f"{len(self._heap)} jobs already queued")
+        if not self._workers:
+            self._start()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (deadline, next(self._seq), kind, fn, args, future))
+        stats["submitted"] += 1
+        self._ready.set()
+        return future
+
+    async def run(self, deadline: float, fn: Callable, *args, kind: str = "rfq"):
+        return await self.submit(deadline, fn, *args, kind=kind)
+
+    def depth(self) -> int:
+        return len(self._heap)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Counters per kind: submitted, completed, failed, shed (expired while queued),
+        cancelled (expired while running) and rejected (queue full)"""
+        return {kind: dict(stats) for kind, stats in self._stats.items()}
+
+    @property
+    def shed(self) -> int:
+        """Jobs dropped because their deadline passed, queued or running"""
+        return sum(s["shed"] + s["cancelled"] for s in self._stats.values())
+
+    async def close(self):
+        """Stop the workers and fail every queued job"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        while self._heap:
+            *_, future = heapq.heappop(self._heap)
+            if not future.done():
+                future.cancel()
+
+    def _kind_stats(self, kind: str) -> Dict[str, int]:
+        stats = self._stats.get(kind)
+        if stats is None:
+            stats = self._stats[kind] = dict.fromkeys(
+                ("submitted", "completed", "failed", "shed", "cancelled", "rejected"), 0
+            )
+        return stats
+
+    def _start(self):
+        self._ready = asyncio.Event()
+        self._workers = [
+            asyncio.create_task(self._work()) for _ in range(self.max_concurrency)
+        ]
+
+    async def _work(self):
+        while True:
+            if not self._heap:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            deadline, _, kind, fn, args, future = heapq.heappop(self._heap)
+            if future.done():  # the caller gave up
+                continue
+            stats = self._stats[kind]
+            started = time.monotonic()
+            remaining = deadline - started
+            # Under overload the earliest deadline is the one least likely to be met, running
+            # it anyway would only get it cancelled and make the next job late as well
+            if remaining <= self._run_times.get(kind, 0.0):
+                stats["shed"] += 1
+                future.set_exception(
+                    DeadlineExpired(f"{kind} job expired while queued")
+                )
+                continue
+            timer = asyncio.timeout(None if math.isinf(remaining) else remaining)
+            try:
+                async with timer:
+                    result = fn(*args)
+                    if inspect.isawaitable(result):
+                        result = await result
+            except asyncio.TimeoutError as e:
+                # Only the scheduler's own timer means the deadline passed, a timeout raised
+                # by the job itself (e.g. an RPC reply that never came) is a failure
+                if timer.expired():
+                    stats["cancelled"] += 1
+                    e = DeadlineExpired(f"{kind} job cancelled at its deadline")
+                else:
+                    stats["failed"] += 1
+                if not future.done():
+                    future.set_exception(e)
+                continue
+            except asyncio.CancelledError:
+                # Either this worker is being stopped, or the job was cancelled from within
+                # (e.g. an abandoned request or a signing pool shut down), which must not
+                # take the worker down with it
+                future.cancel()
+                if asyncio.current_task().cancelling():
+                    raise
+                stats["failed"] += 1
+                continue
+            except Exception as e:
+                stats["failed"] += 1
+                if not future.done():
+                    future.set_exception(e)
+                continue
+            stats["completed"] += 1
+            run_time = time.monotonic() - started
+            average = self._run_times.get(kind, run_time)
+            self._run_times[kind] = average + RUN_TIME_SMOOTHING * (run_time - average)
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,132 @@
+import asyncio
+import threading
+from typing import Dict, Iterable, Optional
+from eth_utils import to_checksum_address
+from web3 import Web3
+from src_config import SEAPORT_ADDRESS
+from src_logging import get_logger
+from src_taker import SEAPORT_ABI
+
+logger = get_logger(__name__)
+
+# Seconds between CounterIncremented log polls
+DEFAULT_COUNTER_POLL_INTERVAL = 12.0
+
+
+class CounterCache:
+    """Seaport counters by offerer, so signing needs no getCounter round trip.
+
+    Counters of the offerers passed to load() are fetched once at startup. watch() (or poll()
+    called by hand) then follows CounterIncremented logs and updates the cached counters from
+    them, so steady-state get() calls do no network I/O. invalidate() forces the next get() to
+    fetch again, e.g. right after the offerer called incrementCounter. A get() for an offerer
+    that was never loaded fetches its counter synchronously and logs a warning; on the event
+    loop use get_async(), which fetches in a worker thread instead.
+
+    Usage:
+        cache = CounterCache(w3)
+        cache.load([address])
+        counter = await cache.get_async(address)
+    """
+
+    def __init__(
+        self,
+        w3: Web3,
+        *,
+        address: str = SEAPORT_ADDRESS,
+        poll_interval: float = DEFAULT_COUNTER_POLL_INTERVAL,
+    ):
+        self.contract = w3.eth.contract(address=address, abi=SEAPORT_ABI)
+        self.w3 = w3
+        self.poll_interval = poll_interval
+        self._counters: Dict[str, int] = {}
+        # Offerers whose CounterIncremented logs are followed
+        self._offerers = set()
+        self._from_block: Optional[int] = None
+        # poll() runs in a worker thread while get() runs on the event loop
+        self._lock = threading.Lock()
+
+    def load(self, offerers: Iterable[str]):
+        """Fetch the current counter of every offerer and follow their logs from here on"""
+        from_block = self.w3.eth.block_number + 1
+        for offerer in offerers:
+            offerer = to_checksum_address(offerer)
+            counter = self._fetch(offerer)
+            with self._lock:
+                self._offerers.add(offerer)
+                self._counters[offerer] = counter
+            logger.info("Seaport counter of %s is %d", offerer, counter)
+        with self._lock:
+            if self._from_block is None:
+                self._from_block = from_block
+
+    def get(self, offerer: str) -> int:
+        offerer = to_checksum_address(offerer)
+        counter = self._cached(offerer)
+        if counter is not None:
+            return counter
+        self.load([offerer])
+        return self._counters[offerer]
+
+    async def get_async(self, offerer: str) -> int:
+        """get() for the event loop: a counter that is not cached is fetched off the loop"""
+        offerer = to_checksum_address(offerer)
+        counter = self._cached(offerer)
+        if counter is not None:
+            return counter
+        await asyncio.to_thread(self.load, [offerer])
+        return self._counters[offerer]
+
+    def _cached(self, offerer: str) -> Optional[int]:
+        with self._lock:
+            counter = self._counters.get(offerer)
+            loaded = offerer in self._offerers
+        if counter is None and not loaded:
+            logger.warning("Seaport counter of %s was not loaded at startup", offerer)
+        return counter
+
+    def invalidate(self, offerer: Optional[str] = None):
+        """Drop the cached counter of an offerer (of all offerers if None)"""
+        with self._lock:
+            if offerer is None:
+                self._counters.clear()
+            else:
+                self._counters.pop(to_checksum_address(offerer), None)
+
+    def poll(self) -> int:
+        """Apply the CounterIncremented logs since the last poll, returns how many matched"""
+        if self._from_block is None:
+            return 0
+        to_block = self.w3.eth.block_number
+        if to_block < self._from_block:
+            return 0
+        logs = self.contract.events.CounterIncremented.get_logs(
+            fromBlock=self._from_block, toBlock=to_block
+        )
+        applied = 0
+        with self._lock:
+            for log in logs:
+                offerer = to_checksum_address(log["args"]["offerer"])
+                if offerer not in self._offerers:
+                    continue
+                self._counters[offerer] = log["args"]["newCounter"]
+                applied += 1
+                logger.info(
+                    "Seaport counter of %s incremented to %d",
+                    offerer,
+                    log["args"]["newCounter"],
+                )
+            self._from_block = to_block + 1
+        return applied
+
+    async def watch(self):
+        """Poll for CounterIncremented logs every poll_interval until cancelled"""
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await asyncio.to_thread(self.poll)
+            except Exception as e:
+                logger.warning("Failed to poll Seaport counter logs: %s", e)
+
+    def _fetch(self, offerer: str) -> int:
+        return self.contract.functions.getCounter(offerer).call()
@@ -1,8 +1,13 @@
+import asyncio
+import functools
 import socketio
-import json
 import web3
-from uuid_extensions import uuid7str
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, List, Tuple, Optional
+from src_rpc import (
+    DEFAULT_REQUEST_TIMEOUT,
+    register_request,
+    wait_for_response,
+)
 from src_taker import (
     SEAPORT_ABI,
     Order,
@@ -10,12 +15,21 @@ from src_taker import (
     OrderParameters,
     dict_int_to_str,
     EIP_712_ORDER_TYPE,
+    ItemType,
 )
 from eth_account import Account
 from eth_account.signers.local import LocalAccount
 from eth_account.datastructures import (
     SignedMessage,
 )
+from src_config import CONDUIT_KEY, SEAPORT_ADDRESS
+from src_logging import LazyJson, get_logger
+from src_nonce import is_already_known
+
+logger = get_logger(__name__)
+
+# Gas limit of a fill transaction, per order
+FILL_GAS = 1000000
 
 
 # https://eips.ethereum.org/EIPS/eip-2098
@@ -36,20 +50,137 @@ def etherToGwei(ether: int) -> str:
     return format(ether * 1e18, "f").split(".")[0]
 
 
+def build_message(msg_id, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    return {"jsonrpc": "2.0", "method": method, "params": params, "id": msg_id}
+
+
 async def emit_message(
     ns: socketio.AsyncClientNamespace,
     sio: socketio.AsyncClient,
     method: str,
     params: Dict[str, Any],
+) -> asyncio.Future:
+    """Send a JSON-RPC request without waiting for the reply.
+
+    Returns a future that the namespace resolves with the JSON-RPC result (or fails with
+    a JsonRpcError) when the reply arrives. Cancelling the future abandons the request.
+    """
+    msg_id = ns.next_message_id()
+    msg = build_message(msg_id, method, params)
+    logger.debug("Sending message: %s", LazyJson(msg, indent=4))
+    future = register_request(ns, msg)
+    await send_payload(ns, sio, msg, [msg], [future])
+    return future
+
+
+async def request_message(
+    ns: socketio.AsyncClientNamespace,
+    sio: socketio.AsyncClient,
+    method: str,
+    params: Dict[str, Any],
+    *,
+    timeout: Optional[float] = DEFAULT_REQUEST_TIMEOUT,
 ):
-    msg_id = uuid7str()
-    msg = {"jsonrpc": "2.0", "method": method, "params": params, "id": msg_id}
-    print(f"Sending message: {json.dumps(msg, indent=4)}")
-    if not hasattr(ns, "sent_messages"):
-        raise ValueError("Namespace must have a sent_messages attribute that is a dict")
-    ns.sent_messages[msg_id] = msg
-    res = await sio.emit("message", msg, namespace=ns.namespace)
-    return res
+    """Send a JSON-RPC request and wait for its result (timeout=None waits forever)"""
+    future = await emit_message(ns, sio, method, params)
+    return await wait_for_response(future, timeout)
+
+
+async def emit_batch(
+    ns: socketio.AsyncClientNamespace,
+    sio: socketio.AsyncClient,
+    calls: List[Tuple[str, Dict[str, Any]]],
+) -> List[asyncio.Future]:
+    """Send (method, params) calls as one JSON-RPC 2.0 batch in a single socket.io emit.
+
+    Returns one future per call, in order. The server may reply with a batch array or with
+    individual messages, replies are matched back to their call by id either way.
+    """
+    if not calls:
+        raise ValueError("Batch must contain at least one call")
+    msgs = [
+        build_message(ns.next_message_id(), method, params) for method, params in calls
+    ]
+    logger.debug("Sending batch: %s", LazyJson(msgs, indent=4))
+    futures = [register_request(ns, msg) for msg in msgs]
+    await send_payload(ns, sio, msgs, msgs, futures)
+    return futures
+
+
+async def send_payload(
+    ns: socketio.AsyncClientNamespace,
+    sio: socketio.AsyncClient,
+    payload: Any,
+    msgs: List[Dict[str, Any]],
+    futures: List[asyncio.Future],
+):
+    """Emit a request or batch directly, or hand it to ns.outbound for rate limiting.
+
+    If the payload cannot be sent, its requests are forgotten and their futures failed.
+    """
+
+    def abandon(exc: Optional[BaseException] = None):
+        for msg, future in zip(msgs, futures):
+            ns.sent_messages.discard(msg["id"])
+            if future.done():
+                continue
+            if exc is None:
+                future.cancel()
+            else:
+                future.set_exception(exc)
+
+    def on_sent(sent: asyncio.Future):
+        if sent.cancelled():
+            abandon()
+        elif sent.exception() is not None:
+            abandon(sent.exception())
+
+    method = msgs[0]["method"]
+    recorder = getattr(ns, "recorder", None)
+    if recorder is not None:
+        recorder.record_outbound(ns.namespace, payload)
+    latency = getattr(ns, "latency", None)
+    callback = None
+    if latency is not None and latency.track_acks:
+        callback = latency.ack_callback(ns.namespace, method)
+
+    outbound = getattr(ns, "outbound", None)
+    try:
+        if outbound is None:
+            await sio.emit(
+                "message", payload, namespace=ns.namespace, callback=callback
+            )
+        else:
+            sent = outbound.submit(
+                "message",
+                payload,
+                namespace=ns.namespace,
+                method=method,
+                tokens=len(msgs),
+                callback=callback,
+            )
+            sent.add_done_callback(on_sent)
+    except Exception:
+        abandon()
+        raise
+
+
+async def request_batch(
+    ns: socketio.AsyncClientNamespace,
+    sio: socketio.AsyncClient,
+    calls: List[Tuple[str, Dict[str, Any]]],
+    *,
+    timeout: Optional[float] = DEFAULT_REQUEST_TIMEOUT,
+) -> List[Any]:
+    """Send a batch and wait for every reply.
+
+    Returns the result of each call in order, or the exception (e.g. JsonRpcError) for calls
+    that failed, so one rejected call does not hide the results of the others.
+    """
+    futures = await emit_batch(ns, sio, calls)
+    return await wait_for_response(
+        asyncio.gather(*futures, return_exceptions=True), timeout
+    )
 
 
 def construct_order_tuple(order: Order):
@@ -90,39 +221,290 @@ def construct_order_tuple(order: Order):
     )
 
 
-def execute_order(w3: web3.Web3, order: Order, pkey: str):
-    account = Account.from_key(pkey)
-    conduit_key = "0xa8c94ae38b04140794a9394b76ac6d0a83ac0b02000000000000000000000000"
+def execute_order(
+    w3: web3.Web3,
+    order: Order,
+    pkey: str,
+    *,
+    nonce: Optional[int] = None,
+    chain_id: Optional[int] = None,
+):
+    """Fill an order and block until its transaction is mined"""
+    txn_hash = send_order(w3, order, pkey, nonce=nonce, chain_id=chain_id)
+    return wait_for_order(w3, txn_hash)
+
+
+def execute_orders(
+    w3: web3.Web3,
+    orders: List[Order],
+    pkey: str,
+    *,
+    nonce: Optional[int] = None,
+    chain_id: Optional[int] = None,
+):
+    """Fill orders, e.g. a taker's orders_to_execute, in a single transaction and block
+    until it is mined"""
+    txn_hash = send_orders(w3, orders, pkey, nonce=nonce, chain_id=chain_id)
+    return wait_for_order(w3, txn_hash)
+
+
+def send_order(
+    w3: web3.Web3,
+    order: Order,
+    pkey: str,
+    *,
+    nonce: Optional[int] = None,
+    chain_id: Optional[int] = None,
+):
+    """Build, sign and broadcast the fulfillOrder transaction, returns its hash"""
+    return send_fill(
+        w3,
+        get_fulfill_order_function(w3, order),
+        pkey,
+        nonce=nonce,
+        chain_id=chain_id,
+    )
+
+
+def send_orders(
+    w3: web3.Web3,
+    orders: List[Order],
+    pkey: str,
+    *,
+    nonce: Optional[int] = None,
+    chain_id: Optional[int] = None,
+):
+    """Build, sign and broadcast one fulfillAvailableOrders transaction filling all
+    `orders`, returns its hash"""
+    return send_fill(
+        w3,
+        get_fulfill_available_orders_function(w3, orders),
+        pkey,
+        gas=FILL_GAS * len(orders),
+        nonce=nonce,
+        chain_id=chain_id,
+    )
+
+
+def send_fill(
+    w3: web3.Web3,
+    fill_function,
+    pkey: str,
+    gas: int = FILL_GAS,
+    *,
+    nonce: Optional[int] = None,
+    chain_id: Optional[int] = None,
+):
+    """Sign and broadcast a fill. A caller sending several fills from one account can
+    pass the nonce (counting up from the first one) and the chain id, which saves the
+    eth_getTransactionCount and eth_chainId requests per transaction."""
+    account = get_account(pkey)
+
+    # Execute transaction
+    logger.info("Address %s is executing order", account.address)
+    if nonce is None:
+        # pending, so that fills sent before the last one was mined get the next nonce
+        nonce = w3.eth.get_transaction_count(account.address, "pending")
+    tx = fill_function.build_transaction(
+        get_fill_transaction_params(w3, account.address, nonce, chain_id, gas=gas)
+    )
+    signed_txn = account.sign_transaction(tx)
+    try:
+        txn_hash = w3.eth.send_raw_transaction(signed_txn.rawTransaction)
+    except ValueError as e:
+        # Sent before, e.g. by a retried request: the original is still pending
+        if not is_already_known(e):
+            raise
+        txn_hash = signed_txn.hash
+    logger.info("tx hash: %s", txn_hash.hex())
+    return txn_hash
+
+
+def wait_for_order(w3: web3.Web3, txn_hash, timeout: float = 120):
+    """Block until a fill transaction is mined, returns its receipt"""
+    tx_receipt = w3.eth.wait_for_transaction_receipt(txn_hash, timeout=timeout)
+    log_receipt_status(tx_receipt)
+    return tx_receipt
+
+
+async def execute_order_async(w3: web3.AsyncWeb3, order: Order, pkey: str):
+    """execute_order on AsyncWeb3: the event loop keeps running until the fill is mined"""
+    txn_hash = await send_order_async(w3, order, pkey)
+    return await wait_for_order_async(w3, txn_hash)
+
+
+async def send_order_async(
+    w3: web3.AsyncWeb3,
+    order: Order,
+    pkey: str,
+    *,
+    nonce: Optional[int] = None,
+    chain_id: Optional[int] = None,
+):
+    """send_order on AsyncWeb3. A nonce and chain id known to the caller, e.g. from a
+    NonceManager, save the eth_getTransactionCount and eth_chainId requests."""
+    return await send_fill_async(
+        w3,
+        get_fulfill_order_function(w3, order),
+        pkey,
+        nonce=nonce,
+        chain_id=chain_id,
+    )
+
+
+async def send_orders_async(
+    w3: web3.AsyncWeb3,
+    orders: List[Order],
+    pkey: str,
+    *,
+    nonce: Optional[int] = None,
+    chain_id: Optional[int] = None,
+):
+    """send_orders on AsyncWeb3"""
+    return await send_fill_async(
+        w3,
+        get_fulfill_available_orders_function(w3, orders),
+        pkey,
+        nonce=nonce,
+        chain_id=chain_id,
+        gas=FILL_GAS * len(orders),
+    )
+
+
+async def send_fill_async(
+    w3: web3.AsyncWeb3,
+    fill_function,
+    pkey: str,
+    *,
+    nonce: Optional[int] = None,
+    chain_id: Optional[int] = None,
+    gas: int = FILL_GAS,
+):
+    account = get_account(pkey)
+
+    logger.info("Address %s is executing order", account.address)
+    if nonce is None:
+        nonce = await w3.eth.get_transaction_count(account.address, "pending")
+    tx = await fill_function.build_transaction(
+        get_fill_transaction_params(w3, account.address, nonce, chain_id, gas=gas)
+    )
+    signed_txn = account.sign_transaction(tx)
+    try:
+        txn_hash = await w3.eth.send_raw_transaction(signed_txn.rawTransaction)
+    except ValueError as e:
+        if not is_already_known(e):
+            raise
+        txn_hash = signed_txn.hash
+    logger.info("tx hash: %s", txn_hash.hex())
+    return txn_hash
+
+
+async def wait_for_order_async(
+    w3: web3.AsyncWeb3, txn_hash, timeout: float = 120, poll_latency: float = 0.1
+):
+    tx_receipt = await w3.eth.wait_for_transaction_receipt(
+        txn_hash, timeout=timeout, poll_latency=poll_latency
+    )
+    log_receipt_status(tx_receipt)
+    return tx_receipt
+
+
+def get_fulfill_order_function(w3, order: Order):
+    """Seaport fulfillOrder call for an order, on a Web3 or an AsyncWeb3 contract"""
     seaport_contract = w3.eth.contract(
-        address="0x00000000000000ADc04C56Bf30aC9d3c0aAF14dC",
+        address=SEAPORT_ADDRESS,
         abi=SEAPORT_ABI,
     )
-
     # Convert order parameters to tuple.
     order_tuple = construct_order_tuple(order)
-    fullfillOrder = seaport_contract.functions.fulfillOrder(order_tuple, conduit_key)
+    return seaport_contract.functions.fulfillOrder(order_tuple, CONDUIT_KEY)
 
-    # Execute transaction
-    print(f"Address {account.address} is executing order")
-    tx = fullfillOrder.build_transaction(
-        {
-            "from": account.address,
-            "nonce": w3.eth.get_transaction_count(account.address),
-            "gasPrice": w3.to_wei("100", "gwei"),
-            "gas": 1000000,
-        }
+
+def get_fulfill_available_orders_function(w3, orders: List[Order]):
+    """Seaport fulfillAvailableOrders call filling all `orders` in one transaction. Orders
+    that are no longer available (filled, cancelled or expired) are skipped by Seaport
+    instead of reverting the whole call."""
+    seaport_contract = w3.eth.contract(
+        address=SEAPORT_ADDRESS,
+        abi=SEAPORT_ABI,
+    )
+    offer_fulfillments, consideration_fulfillments = compute_fulfillments(orders)
+    return seaport_contract.functions.fulfillAvailableOrders(
+        [construct_order_tuple(order) for order in orders],
+        offer_fulfillments,
+        consideration_fulfillments,
+        CONDUIT_KEY,
+        len(orders),
     )
-    signed_txn = w3.eth.account.sign_transaction(tx, pkey)
-    txn_hash = w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-    print(f"tx hash: {txn_hash.hex()}")
 
-    tx_receipt = w3.eth.wait_for_transaction_receipt(txn_hash)
+
+def compute_fulfillments(
+    orders: List[Order],
+) -> Tuple[List[List[Tuple[int, int]]], List[List[Tuple[int, int]]]]:
+    """Fulfillment components of fulfillAvailableOrders, as lists of (orderIndex, itemIndex).
+
+    Items that Seaport can move in a single transfer are aggregated: offer items of the
+    same offerer, conduit and token, and consideration items of the same token and
+    recipient. Every item is in exactly one component.
+    """
+    offer: Dict[tuple, List[Tuple[int, int]]] = {}
+    consideration: Dict[tuple, List[Tuple[int, int]]] = {}
+    for order_index, order in enumerate(orders):
+        parameters = order.parameters
+        for item_index, item in enumerate(parameters.offer):
+            key = (
+                parameters.offerer.lower(),
+                parameters.conduitKey.lower(),
+                *_aggregation_key(item, order_index, item_index),
+            )
+            offer.setdefault(key, []).append((order_index, item_index))
+        for item_index, item in enumerate(parameters.consideration):
+            key = (
+                item.recipient.lower(),
+                *_aggregation_key(item, order_index, item_index),
+            )
+            consideration.setdefault(key, []).append((order_index, item_index))
+    return list(offer.values()), list(consideration.values())
+
+
+def _aggregation_key(item, order_index: int, item_index: int) -> tuple:
+    # Each ERC721 token is a single transfer of its own
+    if item.itemType in (ItemType.ERC721, ItemType.ERC721_WITH_CRITERIA):
+        return (order_index, item_index)
+    return (item.itemType.value, item.token.lower(), int(item.identifierOrCriteria))
+
+
+def get_fill_transaction_params(
+    w3,
+    address: str,
+    nonce: int,
+    chain_id: Optional[int] = None,
+    gas: int = FILL_GAS,
+) -> Dict[str, Any]:
+    params = {
+        "from": address,
+        "nonce": nonce,
+        "gasPrice": w3.to_wei("100", "gwei"),
+        "gas": gas,
+    }
+    if chain_id is not None:
+        params["chainId"] = chain_id
+    return params
+
+
+@functools.lru_cache(maxsize=16)
+def get_account(pkey: str) -> LocalAccount:
+    """Account of a private key, derived once instead of on every fill"""
+    return Account.from_key(pkey)
+
+
+def log_receipt_status(tx_receipt):
     if tx_receipt["status"] == 0:
-        print("Transaction reverted")
+        logger.error("Transaction reverted")
     elif tx_receipt["status"] == 1:
-        print("Transaction success!")
+        logger.info("Transaction success!")
     else:
-        print(f"Unknown tx status: {tx_receipt['status']}")
+        logger.warning("Unknown tx status: %s", tx_receipt["status"])
 
 
 def get_message_to_sign(
@@ -133,7 +515,7 @@ def get_message_to_sign(
         "name": "Seaport",
         "version": "1.5",
         "chainId": 1,
-        "verifyingContract": "0x00000000000000ADc04C56Bf30aC9d3c0aAF14dC",
+        "verifyingContract": SEAPORT_ADDRESS,
     }
 
     # We need to convert ints to str when signing due to limitations of certain RPC providers
@@ -152,7 +534,7 @@ def get_message_to_sign(
         "types": EIP_712_ORDER_TYPE,
         "primaryType": "OrderComponents",
     }
-    print(json.dumps(payload, indent=4))
+    logger.debug("Message to sign: %s", LazyJson(payload, indent=4))
 
     return payload
 
@@ -165,7 +547,11 @@ def int_to_padded_hex(w3: web3.Web3, number: int, nbytes: int):
     return hex_string
 
 
-def sign_order(*, w3: web3.Web3, pkey, components_raw) -> Tuple[str, str]:
+def sign_order(
+    *, w3: web3.Web3, pkey, components_raw, counter: int = 0
+) -> Tuple[str, str]:
+    """Sign an order with the offerer's Seaport counter (see src_seaport.CounterCache)"""
+    components_raw = {**components_raw, "counter": str(counter)}
     totalOriginalConsiderationItems = len(components_raw["consideration"])
     parameters = OrderParameters(
         **components_raw,
@@ -175,8 +561,7 @@ def sign_order(*, w3: web3.Web3, pkey, components_raw) -> Tuple[str, str]:
         **components_raw,
         totalOriginalConsiderationItems=totalOriginalConsiderationItems,
     )
-    # TODO: get counter from seaport
-    full_message = get_message_to_sign(parameters, 0)
+    full_message = get_message_to_sign(parameters, counter)
     signed_msg: SignedMessage = w3.eth.account.sign_typed_data(
         pkey, full_message=full_message
     )
@@ -0,0 +1,108 @@
+import asyncio
+import functools
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, Literal
+from src_eip712 import sign_order_fast
+from src_logging import get_logger
+from src_metrics import LatencyHistogram
+
+logger = get_logger(__name__)
+
+DEFAULT_SIGNING_WORKERS = 4
+
+ExecutorKind = Literal["thread", "process"]
+
+
+def _sign(pkey: str, components_raw: Dict[str, Any], counter: int) -> Dict[str, Any]:
+    return sign_order_fast(pkey=pkey, components_raw=components_raw, counter=counter)
+
+
+def _warm_up() -> int:
+    return os.getpid()
+
+
+class SigningService:
+    """Signs Seaport orders in a worker pool so that QuoteAccepted signing does not block
+    the event loop.
+
+    executor="thread" keeps signing in-process and is enough to keep other events flowing.
+    executor="process" signs in parallel on separate cores. Workers are spawned, not forked,
+    so scripts must guard their entry point with `if __name__ == "__main__"`, and
+    `await start()` before the first burst pays their start-up outside of it.
+    `latency` records the time from sign() to the signed payload, queueing included.
+
+    Usage:
+        ns.signing_service = SigningService(workers=4)
+        ack = await ns.signing_service.sign(components_raw, pkey, counter)
+    """
+
+    def __init__(
+        self,
+        *,
+        workers: int = DEFAULT_SIGNING_WORKERS,
+        executor: ExecutorKind = "thread",
+    ):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.workers = workers
+        self.executor = executor
+        self._pool = self._create_pool(executor, workers)
+        self.latency = LatencyHistogram()
+        self.pending = 0
+        # stats
+        self.signed = 0
+        self.errors = 0
+
+    async def start(self):
+        """Start every worker ahead of the first order"""
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            *(loop.run_in_executor(self._pool, _warm_up) for _ in range(self.workers))
+        )
+
+    async def sign(
+        self, components_raw: Dict[str, Any], pkey: str, counter: int = 0
+    ) -> Dict[str, Any]:
+        """Sign an order, returning the {"components", "signature"} ACK payload"""
+        started = time.monotonic()
+        self.pending += 1
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(
+                self._pool, functools.partial(_sign, pkey, components_raw, counter)
+            )
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.pending -= 1
+        self.signed += 1
+        self.latency.record(time.monotonic() - started)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "executor": self.executor,
+            "workers": self.workers,
+            "signed": self.signed,
+            "errors": self.errors,
+            "pending": self.pending,
+            "latency_ms": self.latency.summary(),
+        }
+
+    def close(self, wait: bool = False):
+        """Shut the pool down, dropping orders not yet picked up by a worker"""
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+    @staticmethod
+    def _create_pool(executor: ExecutorKind, workers: int) -> Executor:
+        if executor == "thread":
+            return ThreadPoolExecutor(workers, thread_name_prefix="hourglass-signing")
+        if executor == "process":
+            # fork would copy the running event loop and socket.io client threads
+            return ProcessPoolExecutor(
+                workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        raise ValueError(f"Unknown executor: {executor}")
@@ -0,0 +1,141 @@
+import time
+from typing import Any, Dict, List, Optional
+from web3 import Web3
+from src_logging import LazyJson, get_logger
+from src_maker import MakerNamespaceBase
+from src_scheduler import DeadlineExpired
+from src_eip712 import sign_order_fast
+from src_taker import Order, TakerNamespaceBase
+
+logger = get_logger(__name__)
+
+
+# ------------------------------ MAKER STRATEGIES ------------------------------
+
+
+class IonDeleverageMakerNamespace(MakerNamespaceBase):
+    """This is a sample market maker for the ion protocol seaport deleverage use case
+
+    The maker will be listening for RFQs within the weETH <> wstETH market.
+
+    The RFQ maker is the one looking to deleverage their ION borrowing position.
+
+    RFQ makers will will submit quotes for the maker where
+    - base_asset: weETH
+    - quote_asset: wstETH
+    - quote_amount: <number>
+
+    The RFQ maker is asking question: "I have quote_amount units of quote_asset, how much base_asset can I get for it?"
+
+    The taker is the order executor in this use case, so the maker will need to sign the order.
+
+    Orders are signed with the precomputed EIP-712 path of src_eip712, on the event loop or,
+    with a `signing_service` set, in its worker pool. Signing needs no provider, so `w3`
+    defaults to an unconnected Web3 instance.
+    """
+
+    def __init__(self, *args, **kwargs):
+        w3 = kwargs.pop("w3", None)
+        super().__init__(*args, **kwargs)
+        self.w3 = w3 or Web3()
+
+    async def on_QuoteAccepted(self, data):
+        """The maker had one of their quotes accepted by the RFQ maker
+
+        With a scheduler set, signing runs by the RFQ's deadline and is skipped (no ACK)
+        once the RFQ has expired.
+        """
+        rfqId = data.get("rfqId")
+        logger.info("EVENT [QuoteAccepted]: Received accepted quote for RFQ %s", rfqId)
+        if self.scheduler is None:
+            return await self.sign_quote(data)
+        try:
+            return await self.scheduler.run(
+                self.rfq_deadlines.get(rfqId), self.sign_quote, data, kind="sign"
+            )
+        except DeadlineExpired:
+            logger.warning("RFQ %s expired before its order was signed", rfqId)
+            return None
+
+    async def sign_quote(self, data):
+        # quoteId = data["quoteId"]
+        seaportOrderComponents = data["seaportOrderComponents"]
+        seaportOrderComponents["offerer"] = self.address
+        seaportOrderComponents["consideration"][1]["recipient"] = self.address
+        counter = 0
+        if self.counter_cache is not None:
+            counter = await self.counter_cache.get_async(self.address)
+
+        if self.signing_service is not None:
+            # ACK with signed payload
+            return await self.signing_service.sign(
+                seaportOrderComponents, self.pkey, counter
+            )
+        res = sign_order_fast(
+            components_raw=seaportOrderComponents, pkey=self.pkey, counter=counter
+        )
+        components = res["components"]
+        signature = res["signature"]
+        # ACK with signed payload
+        return {"components": components, "signature": signature}
+
+
+def ion_deleverage_pricer(rfq: Dict[str, Any]) -> Optional[Dict[str, str]]:
+    """Sample QuotingEngine pricer: 112 weETH for every 100 wstETH, as quoted in the notebook"""
+    if rfq.get("quoteAmount") is None:
+        return None
+    return {"base_amount": str(int(rfq["quoteAmount"]) * 112 // 100)}
+
+
+# ------------------------------ TAKER STRATEGIES ------------------------------
+
+
+class IonTakerNamespace(TakerNamespaceBase):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.orders_to_execute: List[Order] = []
+        # Set to an ExecutionPipeline to fill orders as they are created
+        self.execution_pipeline = None
+        self.rfqIdToBestQuote: Dict[str, Dict] = {}
+
+    # ------------------------------ Event Handlers ------------------------------
+
+    def on_BestQuote(self, data):
+        """This namespace handles RFQ's where the taker is the executor
+        - When the BestQuote is emitted, we simply store the value.
+        """
+        logger.info("EVENT [BestQuote]: Received best quote: %s", data)
+        # Populate mapping of rfq id to best quote
+        rfqId = data["rfqId"]
+        rfq = self.find_rfq_or_throw(rfqId)
+        if rfq.executor != "TAKER":
+            raise ValueError(f"Invalid RFQ executor: {rfq.executor}")
+        self.rfqIdToBestQuote[rfqId] = data["bestQuote"]
+        return "ACK"
+
+    def on_OrderCreated(self, data):
+        """After the taker accepts the quote, the market maker generates a signed order.
+        This event handler receives this data from the market maker and stores it
+        for later execution, or queues it on the execution pipeline if there is one.
+        """
+        received_at = time.monotonic()
+        logger.debug(
+            "EVENT [OrderCreated]: Received request to take order: %s",
+            LazyJson(data, indent=4),
+        )
+        signature = data["signature"]
+        parameters = data["components"]
+        del parameters["counter"]
+        parameters["totalOriginalConsiderationItems"] = len(
+            data["components"]["consideration"]
+        )
+        order = Order(
+            parameters=parameters,
+            signature=signature,
+        )
+        if self.execution_pipeline is not None:
+            self.execution_pipeline.submit(order, received_at)
+        else:
+            self.orders_to_execute.append(order)
+        return "ACK"
@@ -0,0 +1,218 @@
+import asyncio
+import random
+import socketio
+import time
+from typing import Any, Dict, List, Optional
+from src_logging import get_logger
+from src_metrics import LatencyHistogram
+from src_token_cache import TokenCache, is_connection_refused
+
+logger = get_logger(__name__)
+
+DEFAULT_MIN_BACKOFF = 0.25
+DEFAULT_MAX_BACKOFF = 30.0
+
+
+class ConnectionSupervisor:
+    """Keeps a socketio.AsyncClient connected and restores its state after a drop.
+
+    - reconnects with exponential backoff and jitter, the first retry is immediate
+    - authenticates with the latest token received via AccessToken, falling back to the
+      credentials in `auth` if the server refuses the token (tokens are only reused when a
+      single namespace is connected, since every namespace receives the same auth); a
+      server that cannot be reached is retried with the same token
+    - notices a drop through the namespaces' disconnect events (JsonRpcNamespace
+      disconnect_listeners) rather than waiting for the engine.io transport to close, so
+      a single namespace disconnected by the server while others keep the shared
+      transport up is noticed too; the client then reconnects every namespace
+    - with a `token_cache`, starts from the token stored under `token_key` and stores every
+      new one, so a restarted process skips the credential login
+    - once connected, awaits `resubscribe()` on every registered namespace that defines it
+      (e.g. MakerNamespaceBase replays its market subscriptions)
+    - records time-to-recovery, from the drop until resubscription completes
+
+    python-socketio's own reconnection is disabled, since it reuses the auth of the first
+    connect and knows nothing about subscriptions. Pass `supervisor.set_access_token` as the
+    namespaces' set_access_token so the supervisor sees new tokens.
+
+    Usage:
+        supervisor = ConnectionSupervisor(sio, server_url, auth=auth)
+        ns = MakerNamespaceBase(namespace, set_access_token=supervisor.set_access_token)
+        sio.register_namespace(ns)
+        await supervisor.start()
+    """
+
+    def __init__(
+        self,
+        sio: socketio.AsyncClient,
+        server_url: str,
+        *,
+        auth: Dict[str, Any],
+        namespaces: Optional[List[str]] = None,
+        transports: Optional[List[str]] = None,
+        min_backoff: float = DEFAULT_MIN_BACKOFF,
+        max_backoff: float = DEFAULT_MAX_BACKOFF,
+        token_cache: Optional[TokenCache] = None,
+        token_key: Optional[str] = None,
+    ):
+        if (token_cache is None) != (token_key is None):
+            raise ValueError("token_cache and token_key must be provided together")
+        self.sio = sio
+        self.sio.reconnection = False
+        self.server_url = server_url
+        self.auth = {k: v for k, v in auth.items() if k != "token"}
+        self.token_cache = token_cache
+        self.token_key = token_key
+        self.token: Optional[str] = auth.get("token")
+        if self.token is None and token_cache is not None:
+            self.token = token_cache.get(token_key)
+        self.namespaces = namespaces
+        self.transports = transports or ["websocket"]
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+
+        self.connects = 0
+        self.failed_attempts = 0
+        self.last_recovery_s: Optional[float] = None
+        self.recovery = LatencyHistogram()
+        self.connected = asyncio.Event()
+        self._disconnected_at: Optional[float] = None
+        self._dropped = asyncio.Event()
+        self._dropped_namespace: Optional[str] = None
+        self._up = False
+        self._stopping = False
+        self._used_token = False
+        self._task: Optional[asyncio.Task] = None
+
+    def set_access_token(self, token: str):
+        self.token = token
+        if self.token_cache is not None:
+            self.token_cache.store(self.token_key, token)
+
+    async def start(self, *, wait: bool = True):
+        """Start supervising, by default waiting until the first connection is up"""
+        self._stopping = False
+        for ns in self.sio.namespace_handlers.values():
+            listeners = getattr(ns, "disconnect_listeners", None)
+            if listeners is not None and self._on_disconnect not in listeners:
+                listeners.append(self._on_disconnect)
+        self._task = asyncio.create_task(self._run())
+        if wait:
+            await self.connected.wait()
+
+    async def stop(self):
+        self._stopping = True
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.sio.connected:
+            await self.sio.disconnect()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connects": self.connects,
+            "failed_attempts": self.failed_attempts,
+            "last_recovery_ms": (
+                self.last_recovery_s * 1000
+                if self.last_recovery_s is not None
+                else None
+            ),
+            "recovery_ms": self.recovery.summary() if self.recovery.count else {},
+        }
+
+    def backoff(self, attempt: int) -> float:
+        """Delay before retry number `attempt` (0 retries immediately)"""
+        if attempt == 0:
+            return 0.0
+        cap = min(self.max_backoff, self.min_backoff * 2 ** (attempt - 1))
+        return cap / 2 + random.uniform(0, cap / 2)
+
+    async def _run(self):
+        attempt = 0
+        while not self._stopping:
+            await asyncio.sleep(self.backoff(attempt))
+            self._dropped.clear()
+            try:
+                await self._connect()
+            except socketio.exceptions.ConnectionError as e:
+                self.failed_attempts += 1
+                if self._used_token and is_connection_refused(e):
+                    logger.warning("Cached token was refused (%s)", e)
+                    self.token = None
+                    if self.token_cache is not None:
+                        await asyncio.to_thread(
+                            self.token_cache.invalidate, self.token_key
+                        )
+                else:
+                    logger.warning("Connection attempt %d failed: %s", attempt + 1, e)
+                    attempt += 1
+                continue
+            attempt = 0
+            self.connects += 1
+            self._up = True
+            await self._resubscribe()
+            if self._disconnected_at is not None:
+                self.last_recovery_s = time.monotonic() - self._disconnected_at
+                self.recovery.record(self.last_recovery_s)
+                self._disconnected_at = None
+                logger.info("Recovered in %.3fs", self.last_recovery_s)
+            self.connected.set()
+
+            await self._dropped.wait()
+            self._up = False
+            self.connected.clear()
+            if self._stopping:
+                pass
+            elif self.sio.connected:
+                # The server disconnected one namespace and the others share a transport
+                # that is still up, which never ends on its own
+                logger.warning(
+                    "Namespace %s was disconnected, reconnecting",
+                    self._dropped_namespace,
+                )
+            else:
+                logger.warning("Connection to %s lost, reconnecting", self.server_url)
+            await self._reset()
+
+    def _on_disconnect(self, namespace: str):
+        """disconnect listener of the supervised namespaces, called as soon as the server
+        disconnects a namespace or the transport closes"""
+        if self._stopping or not self._up:
+            return
+        if self._disconnected_at is None:
+            self._disconnected_at = time.monotonic()
+        if not self._dropped.is_set():
+            self._dropped_namespace = namespace
+            self._dropped.set()
+
+    async def _reset(self):
+        if self.sio.connected:
+            await self.sio.disconnect()
+        # A local disconnect() finishes resetting engine.io after its read loop ends
+        while self.sio.eio.state != "disconnected":
+            await asyncio.sleep(0.01)
+
+    async def _connect(self):
+        auth = dict(self.auth)
+        namespaces = self.namespaces or list(self.sio.namespace_handlers)
+        # The same auth goes to every namespace and a token belongs to a single role
+        self._used_token = self.token is not None and len(namespaces) == 1
+        if self._used_token:
+            auth["token"] = self.token
+        await self.sio.connect(
+            self.server_url,
+            namespaces=namespaces,
+            transports=self.transports,
+            auth=auth,
+        )
+
+    async def _resubscribe(self):
+        for ns in list(self.sio.namespace_handlers.values()):
+            resubscribe = getattr(ns, "resubscribe", None)
+            if resubscribe is None:
+                continue
+            try:
+                await resubscribe()
+            except Exception:
+                logger.exception("Failed to resubscribe namespace %s", ns.namespace)
@@ -1,12 +1,16 @@
-import socketio
 from typing import Optional, Any
 from pydantic import BaseModel
 from enum import Enum
 from typing import List
-import json
+from src_rpc import JsonRpcNamespace
+from src_logging import LazyJson, get_logger
+from src_scheduler import DeadlineTable, rfq_deadline
+from src_token_cache import describe_token
 
 _NAMESPACE = "/taker"
 
+logger = get_logger(__name__)
+
 
 def get_namespace_and_server_url(env: str) -> [str, str]:
     if env == "local":
@@ -16,7 +20,7 @@ def get_namespace_and_server_url(env: str) -> [str, str]:
     raise ValueError(f"Unknown environment: {env}")
 
 
-class TakerNamespaceBase(socketio.AsyncClientNamespace):
+class TakerNamespaceBase(JsonRpcNamespace):
 
     def __init__(self, *args, **kwargs):
         set_access_token = kwargs.get("set_access_token", None)
@@ -26,8 +30,11 @@ class TakerNamespaceBase(socketio.AsyncClientNamespace):
 
         super().__init__(*args, **kwargs)
 
-        self.sent_messages = {}
         self.rfqs: List[RFQ] = []
+        # Set to a DeadlineScheduler to run accept_quote(rfq_id=...) earliest-deadline-first
+        self.scheduler = None
+        # Deadlines of the RFQs created by this taker, from their ttlMsecs
+        self.rfq_deadlines = DeadlineTable()
         self.set_access_token = set_access_token
 
     # ------------------------------ Utility ------------------------------
@@ -41,52 +48,41 @@ class TakerNamespaceBase(socketio.AsyncClientNamespace):
     # ------------------------------ Event Handlers ------------------------------
 
     def on_connect(self):
-        print(f"EVENT [connect]: Connected to the {self.namespace} namespace.")
+        logger.info("EVENT [connect]: Connected to the %s namespace.", self.namespace)
 
     def on_disconnect(self):
-        print(f"EVENT [disconnect]: Disconnected from the {self.namespace} namespace.")
+        logger.info(
+            "EVENT [disconnect]: Disconnected from the %s namespace.", self.namespace
+        )
 
     # ------------------------------ Event Handlers ------------------------------
 
     def on_AccessToken(self, data):
-        print(f"EVENT [AccessToken]: Received access token: {data}")
+        logger.debug(
+            "EVENT [AccessToken]: Received access token (%s)",
+            describe_token(data["accessToken"]),
+        )
         self.set_access_token(data["accessToken"])
         return "ACK"
 
     def on_OrderFulfilled(self, data):
-        print(
-            f"EVENT [OrderFulfilled]: Received fulfilled order: {json.dumps(data, indent=4)}"
+        logger.debug(
+            "EVENT [OrderFulfilled]: Received fulfilled order: %s",
+            LazyJson(data, indent=4),
         )
         return "ACK"
 
     # ------------------------------ JSONRPC Method Handlers ------------------------------
+    # These can be overwritten in subclasses to handle successful responses idiosyncratically.
+    # Subclasses can handle additional methods by defining handle_successful_<method>.
+
+    def handle_successful_hg_requestQuote(self, result):
+        logger.info("Successfully requested quote %s", result)
+        self.rfqs.append(RFQ(**result))
+        self.rfq_deadlines.add(result["rfqId"], rfq_deadline(result))
 
-    def on_message(self, data):
-        print(f"EVENT [message]: Received message: {data}")
-        msg_id = data["id"]
-        result = data["result"] if "result" in data else None
-        error = data["error"] if "error" in data else None
-        jsonrpc = data["jsonrpc"]
-        if not jsonrpc == "2.0":
-            raise Exception("Invalid JSON-RPC version received from server")
-        # handle response based on sent messages
-        if not msg_id in self.sent_messages:
-            raise Exception(f"Received message with id: {msg_id} that was never sent")
-        ori_msg = self.sent_messages[msg_id]
-        # handle errors
-        if error:
-            print(f"For request {msg_id} received error: {error}")
-            return
-        # handle results
-        if ori_msg["method"] == "hg_requestQuote":
-            print(f"Successfully requested quote {result}")
-            self.rfqs.append(RFQ(**result))
-        elif ori_msg["method"] == "hg_acceptQuote":
-            print(f"Successfully accepted quote {result}")
-        else:
-            raise Exception(
-                f"Unknown method {ori_msg['method']} in sent message {msg_id}"
-            )
+    def handle_successful_hg_acceptQuote(self, result):
+        logger.info("Successfully accepted quote %s", result)
 
 
 class TokenType(Enum):
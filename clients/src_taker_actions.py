@@ -1,7 +1,12 @@
+import functools
 import socketio
-from typing import Literal, Optional
-from src_shared import emit_message
+from typing import Any, Dict, List, Literal, Optional
+from src_shared import request_batch, request_message
+from src_rpc import DEFAULT_REQUEST_TIMEOUT
 from src_taker import OrderComponents
+from src_logging import get_logger
+
+logger = get_logger(__name__)
 
 
 async def create_rfq(
@@ -17,13 +22,57 @@ async def create_rfq(
     quote_asset_receiver_address: Optional[str] = None,
     use_case: Literal["DEFAULT", "ION_DELEVERAGE"],
     use_case_metadata: Optional[dict] = None,
+    timeout: Optional[float] = DEFAULT_REQUEST_TIMEOUT,
+):
+    method = "hg_requestQuote"
+    params = get_rfq_params(
+        base_asset_address=base_asset_address,
+        quote_asset_address=quote_asset_address,
+        base_amount=base_amount,
+        quote_amount=quote_amount,
+        chain_id=chain_id,
+        executor=executor,
+        quote_asset_receiver_address=quote_asset_receiver_address,
+        use_case=use_case,
+        use_case_metadata=use_case_metadata,
+    )
+    logger.debug("Attempting to create RFQ")
+    return await request_message(ns, sio, method, params, timeout=timeout)
+
+
+async def create_rfqs(
+    ns: socketio.AsyncClientNamespace,
+    sio: socketio.AsyncClient,
+    rfqs: List[Dict[str, Any]],
+    *,
+    timeout: Optional[float] = DEFAULT_REQUEST_TIMEOUT,
+) -> List[Any]:
+    """Create several RFQs with a single JSON-RPC batch.
+
+    rfqs: keyword arguments of create_rfq for each RFQ. Returns one result (or exception) per RFQ.
+    """
+    calls = [("hg_requestQuote", get_rfq_params(**rfq)) for rfq in rfqs]
+    logger.debug("Attempting to create %d RFQs", len(calls))
+    return await request_batch(ns, sio, calls, timeout=timeout)
+
+
+def get_rfq_params(
+    *,
+    base_asset_address: str,
+    quote_asset_address: str,
+    base_amount: str = None,
+    quote_amount: str = None,
+    chain_id: int,
+    executor: Literal["MAKER", "TAKER"],
+    quote_asset_receiver_address: Optional[str] = None,
+    use_case: Literal["DEFAULT", "ION_DELEVERAGE"],
+    use_case_metadata: Optional[dict] = None,
 ):
     if base_amount is None and quote_amount is None:
         raise ValueError("Either base_amount or quote_amount must be provided")
     if base_amount is not None and quote_amount is not None:
         raise ValueError("Only one of base_amount or quote_amount must be provided")
 
-    method = "hg_requestQuote"
     params = {
         "baseAssetAddress": base_asset_address,
         "quoteAssetAddress": quote_asset_address,
@@ -42,9 +91,7 @@ async def create_rfq(
         params["baseAmount"] = base_amount
     if quote_amount is not None:
         params["quoteAmount"] = quote_amount
-
-    print(f"Attempting to create RFQ")
-    await emit_message(ns, sio, method, params)
+    return params
 
 
 async def accept_quote(
@@ -54,7 +101,12 @@ async def accept_quote(
     quote_id: int,
     components: Optional[OrderComponents] = None,
     signature: Optional[str] = None,
+    rfq_id: Optional[int] = None,
+    timeout: Optional[float] = DEFAULT_REQUEST_TIMEOUT,
 ):
+    """Accept a quote. Given the rfq_id and a namespace with a `scheduler`, the request runs
+    on the scheduler by the RFQ's deadline and raises DeadlineExpired once the RFQ expired.
+    """
     method = "hg_acceptQuote"
     if components is None and signature is not None:
         raise ValueError("If signature is provided, components must also be provided")
@@ -65,6 +117,16 @@ async def accept_quote(
         "components": components,
         "signature": signature,
     }
-    print(f"Attempted to accept quote {quote_id}")
-    res = await emit_message(ns, sio, method, params)
-    print(res)
+    logger.debug("Attempting to accept quote %s", quote_id)
+    scheduler = getattr(ns, "scheduler", None)
+    if scheduler is not None and rfq_id is not None:
+        return await scheduler.run(
+            ns.rfq_deadlines.get(rfq_id),
+            functools.partial(request_message, timeout=timeout),
+            ns,
+            sio,
+            method,
+            params,
+            kind="accept",
+        )
+    return await request_message(ns, sio, method, params, timeout=timeout)
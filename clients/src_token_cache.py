@@ -0,0 +1,200 @@
+import asyncio
+import base64
+import json
+import os
+import socketio
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set
+from src_logging import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".hourglass", "tokens.json")
+# Lifetime assumed for tokens that are not JWTs with an exp claim
+DEFAULT_TOKEN_TTL = 3600.0
+# Tokens this close to expiry are not handed out, so a connect never races the expiry
+DEFAULT_EXPIRY_MARGIN = 60.0
+# AsyncClient.connect raises this when the server answered but refused a namespace, e.g.
+# for a rejected token, rather than when the server could not be reached
+NAMESPACE_REFUSED = "One or more namespaces failed to connect"
+
+
+def is_connection_refused(error: Exception) -> bool:
+    """True if a socketio ConnectionError means the server refused the auth, False for a
+    transport failure such as an unreachable server"""
+    return NAMESPACE_REFUSED in str(error)
+
+
+def get_token_expiry(token: str) -> Optional[float]:
+    """Return the exp claim of a JWT as a unix timestamp, or None if token is not a JWT"""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        exp = json.loads(base64.urlsafe_b64decode(payload))["exp"]
+        return float(exp)
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+def describe_token(token: str) -> str:
+    """Stand-in for a token in logs, which must never contain the bearer token itself"""
+    expiry = get_token_expiry(token)
+    if expiry is None:
+        return "token without expiry"
+    return "token expiring " + time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(expiry))
+
+
+class TokenCache:
+    """Access tokens persisted in a JSON file, keyed by environment, role and user.
+
+    Tokens expire at their JWT exp claim, or `default_ttl` seconds after being stored when
+    the token carries no expiry. The file is rewritten atomically (write to a temporary file
+    in the same directory, then os.replace), re-reading it first so that processes sharing
+    the cache do not drop each other's tokens, and is only readable by the current user.
+    store() does the write in a worker thread when called on an event loop, e.g. from an
+    AccessToken handler, so the fsync never blocks the loop.
+
+    Usage:
+        cache = TokenCache()
+        key = TokenCache.key("staging", "maker", "Wintermute")
+        ns = MakerNamespaceBase(namespace, set_access_token=cache.setter(key))
+        await connect_with_cached_token(sio, server_url, cache=cache, key=key, ...)
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        *,
+        default_ttl: float = DEFAULT_TOKEN_TTL,
+        expiry_margin: float = DEFAULT_EXPIRY_MARGIN,
+    ):
+        self.path = path
+        self.default_ttl = default_ttl
+        self.expiry_margin = expiry_margin
+        self._lock = threading.RLock()
+        # Tokens handed to store() and not written yet, only the latest per key is kept
+        self._unwritten: Dict[str, str] = {}
+        self._writes: Set[asyncio.Future] = set()
+
+    @staticmethod
+    def key(env: str, role: str, user: str) -> str:
+        return f"{env}/{role}/{user}"
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached token for key, or None if there is none or it is about to expire"""
+        entry = self._load().get(key)
+        if entry is None:
+            return None
+        if entry["expires_at"] - self.expiry_margin <= time.time():
+            logger.debug("Cached token for %s has expired", key)
+            return None
+        return entry["token"]
+
+    def put(self, key: str, token: str):
+        expires_at = get_token_expiry(token) or time.time() + self.default_ttl
+        with self._lock:
+            entries = self._load()
+            entries[key] = {"token": token, "expires_at": expires_at}
+            self._save(entries)
+
+    def store(self, key: str, token: str):
+        """put() that runs in a worker thread when called on an event loop"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self.put(key, token)
+            return
+        self._unwritten[key] = token
+        write = asyncio.ensure_future(asyncio.to_thread(self._write_unwritten, key))
+        self._writes.add(write)
+        write.add_done_callback(self._on_written)
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._unwritten.pop(key, None)
+            entries = self._load()
+            if entries.pop(key, None) is not None:
+                self._save(entries)
+
+    def setter(self, key: str) -> Callable[[str], None]:
+        """Return a set_access_token callback that stores tokens under key"""
+
+        def set_access_token(token: str):
+            self.store(key, token)
+
+        return set_access_token
+
+    def _write_unwritten(self, key: str):
+        with self._lock:
+            token = self._unwritten.pop(key, None)
+            if token is not None:
+                self.put(key, token)
+
+    def _on_written(self, write: asyncio.Future):
+        self._writes.discard(write)
+        if not write.cancelled() and write.exception() is not None:
+            logger.error("Failed to store access token: %s", write.exception())
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path) as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable token cache %s: %s", self.path, e)
+            return {}
+        now = time.time()
+        return {k: v for k, v in entries.items() if v.get("expires_at", 0) > now}
+
+    def _save(self, entries: Dict[str, Dict[str, Any]]):
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tokens-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(entries, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+async def connect_with_cached_token(
+    sio: socketio.AsyncClient,
+    server_url: str,
+    *,
+    namespaces: List[str],
+    auth: Dict[str, Any],
+    cache: TokenCache,
+    key: str,
+    transports: Optional[List[str]] = None,
+):
+    """Connect with the cached token for key if there is one, otherwise or if the server
+    rejects it with the credentials in auth. The server's AccessToken refreshes the cache
+    through the namespace's set_access_token (see TokenCache.setter). The ConnectionError
+    of an unreachable server is raised and the cached token kept.
+    """
+    transports = transports or ["websocket"]
+    token = await asyncio.to_thread(cache.get, key)
+    if token is not None:
+        try:
+            await sio.connect(
+                server_url,
+                namespaces=namespaces,
+                transports=transports,
+                auth={**auth, "token": token},
+            )
+            return
+        except socketio.exceptions.ConnectionError as e:
+            if not is_connection_refused(e):
+                raise
+            logger.warning("Cached token for %s was rejected (%s)", key, e)
+            await asyncio.to_thread(cache.invalidate, key)
+    await sio.connect(
+        server_url, namespaces=namespaces, transports=transports, auth=auth
+    )